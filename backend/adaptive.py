@@ -0,0 +1,66 @@
+from collections import deque
+
+from metrics import metrics
+
+# Highest quality first; inference runs at `size` and detections are mapped
+# back to the canonical frame space, so downstream code never sees the change
+QUALITY_LADDER = [
+    {"size": (640, 480), "confidence": 0.3, "nms_threshold": 0.3},
+    {"size": (512, 384), "confidence": 0.3, "nms_threshold": 0.3},
+    {"size": (416, 312), "confidence": 0.25, "nms_threshold": 0.35},
+    {"size": (320, 240), "confidence": 0.25, "nms_threshold": 0.4},
+]
+
+
+class QualityController:
+    """
+    Closed-loop controller that picks an inference resolution from a ladder to
+    keep per-frame processing time within a budget.
+
+    Steps down a level when the p95 of the last `window` frames exceeds the
+    target, and back up when p95 falls below `headroom * target`. After each
+    change the window is cleared, so the next decision is made on frames
+    processed at the new level only.
+    """
+
+    def __init__(self, target_ms=66, ladder=QUALITY_LADDER, window=30, headroom=0.6):
+        self.target = target_ms / 1000
+        self.ladder = ladder
+        self.window = window
+        self.headroom = headroom
+        self.level = 0
+        self.samples = deque(maxlen=window)
+
+    @property
+    def settings(self):
+        return self.ladder[self.level]
+
+    def p95(self):
+        samples = sorted(self.samples)
+        return samples[min(int(0.95 * len(samples)), len(samples) - 1)]
+
+    def observe(self, frame_seconds):
+        """Records one frame's processing time; returns True if the level changed."""
+        self.samples.append(frame_seconds)
+        metrics.observe("frame_s", frame_seconds)
+        if len(self.samples) < self.window:
+            return False
+
+        p95 = self.p95()
+        if p95 > self.target and self.level < len(self.ladder) - 1:
+            self.level += 1
+        elif p95 < self.target * self.headroom and self.level > 0:
+            self.level -= 1
+        else:
+            return False
+
+        self.samples.clear()
+        metrics.gauge("quality_level", self.level)
+        print(f"Quality level {self.level}: inference at {self.settings['size']} (p95 {p95 * 1000:.0f}ms)")
+        return True
+
+    def apply(self, pipeline):
+        settings = self.settings
+        pipeline.inference_size = settings["size"]
+        pipeline.confidence = settings["confidence"]
+        pipeline.nms_threshold = settings["nms_threshold"]
@@ -0,0 +1,210 @@
+"""
+Offline match analysis.
+
+Splits a recorded match into chunks and runs motion, detection, tracking and
+physics on each chunk in a process pool, then stitches the per-chunk shuttle
+tracks back together and writes trajectories and point events.
+
+Usage:
+    python analyze.py match.mp4 --out analysis --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from detectors import load_detector, DEFAULT_MODEL
+from physics import PhysicsCalculator
+from pipeline import ShuttlePipeline, prepare_frame, calculate_distance, COURT_Y, MAX_LINE_LENGTH
+
+# Loaded once per worker process by _init_worker
+_detector = None
+
+
+def _init_worker(model, threads, quantized):
+    global _detector
+    options = {"threads": threads, "quantized": quantized} if model.endswith(".onnx") else {}
+    _detector = load_detector(model, **options)
+
+
+def split_chunks(frame_count, chunk_frames):
+    return [(start, min(start + chunk_frames, frame_count))
+            for start in range(0, frame_count, chunk_frames)]
+
+
+def analyze_chunk(input_file, start, end, fps, rotate=False):
+    """
+    Tracks the shuttle over frames [start, end). The frame before `start` is
+    read as a one-frame overlap so the motion detector can seed its `prev_gray`.
+    """
+    cap = cv2.VideoCapture(input_file)
+    first = max(start - 1, 0)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    pipeline = ShuttlePipeline(_detector)
+    rows = []
+    for index in range(first, end):
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        rgb_frame = prepare_frame(frame, rotate)
+        if index < start:
+            pipeline.motion_frame(rgb_frame)
+            continue
+
+        result = pipeline.process(rgb_frame, index / fps, annotate=False)
+        if result is None or result["position"] is None:
+            continue
+
+        X, Y, Z = result["position"]
+        rows.append({
+            "frame": index,
+            "time": index / fps,
+            "x": float(X),
+            "y": float(Y),
+            "z": float(Z),
+            "observed": result["observed"],
+            "tracker_id": result["tracker_id"],
+        })
+
+    cap.release()
+    return rows
+
+
+def stitch_tracks(chunks, max_gap):
+    """
+    Assigns global track ids to the rows of consecutive chunks. A track that
+    starts within `max_gap` frames of where the previous chunk's last track
+    ended, and close enough to it, continues that track instead of starting
+    a new one. Extrapolated rows belong to the most recent track.
+
+    SORT only hands out an id once a track has been seen for a few frames, so
+    a chunk usually starts with untracked rows. Those continue the previous
+    chunk's track when they are close enough to its tail, and otherwise join
+    the chunk's first tracked id.
+    """
+    stitched = []
+    next_id = 1
+    tail = None  # (track, frame, (x, y)) of the previous chunk's last row
+
+    def continues(row):
+        return (tail is not None and row["frame"] - tail[1] <= max_gap
+                and calculate_distance((row["x"], row["y"]), tail[2]) <= MAX_LINE_LENGTH)
+
+    for rows in chunks:
+        mapping = {}
+        current = None
+        pending = []  # untracked rows before the chunk's first track
+
+        for row in rows:
+            local = row.pop("tracker_id")
+            if local is None or local < 0:
+                if current is None and continues(row):
+                    current = tail[0]
+                    tail = (current, row["frame"], (row["x"], row["y"]))
+                track = current
+            elif local in mapping:
+                track = mapping[local]
+            else:
+                if continues(row):
+                    track = tail[0]
+                else:
+                    track = next_id
+                    next_id += 1
+                mapping[local] = track
+                tail = None
+
+            if track is None:
+                pending.append(row)
+            else:
+                for earlier in pending:
+                    earlier["track"] = track
+                pending = []
+                current = track
+                row["track"] = track
+            stitched.append(row)
+
+        if pending:
+            for row in pending:
+                row["track"] = next_id
+            next_id += 1
+
+        if rows:
+            last = rows[-1]
+            tail = (last["track"], last["frame"], (last["x"], last["y"]))
+
+    return stitched
+
+
+def detect_points(rows):
+    """Replays the stitched trajectory through the point check in capture order."""
+    physics = PhysicsCalculator()
+    points = []
+    for row in rows:
+        side = physics.check_for_point(row["x"], row["y"], row["z"], row["time"], COURT_Y)
+        if side:
+            points.append({"frame": row["frame"], "time": row["time"], "side": side, "team": side - 1})
+    return points
+
+
+def analyze_video(input_file, output_dir, workers=None, chunk_seconds=60, rotate=False,
+                  model=DEFAULT_MODEL, threads=None, quantized=False, max_gap=15):
+    cap = cv2.VideoCapture(input_file)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    cap.release()
+
+    chunks = split_chunks(frame_count, max(int(chunk_seconds * fps), 2))
+    print(f"Analyzing {frame_count} frames in {len(chunks)} chunk(s)")
+
+    if model.endswith(".onnx"):
+        # Build the int8/optimized graph caches once so workers don't race to write them
+        load_detector(model, threads=threads, quantized=quantized)
+
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model, threads, quantized)) as executor:
+        futures = [executor.submit(analyze_chunk, input_file, start, end, fps, rotate)
+                   for start, end in chunks]
+        results = [future.result() for future in futures]
+
+    rows = stitch_tracks(results, max_gap)
+    points = detect_points(rows)
+    elapsed = time.time() - started
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "trajectories.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["frame", "time", "x", "y", "z", "observed", "track"])
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(output_dir, "points.json"), "w") as f:
+        json.dump(points, f, indent=2)
+
+    duration = frame_count / fps
+    print(f"Analyzed {duration:.1f}s of video in {elapsed:.1f}s "
+          f"({duration / max(elapsed, 1e-6):.1f}x real time): "
+          f"{len(rows)} positions, {len({row['track'] for row in rows})} tracks, {len(points)} points")
+    return rows, points
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline shuttle tracking and point detection")
+    parser.add_argument("input_file")
+    parser.add_argument("--out", default="analysis", help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-seconds", type=float, default=60)
+    parser.add_argument("--rotate", action="store_true",
+                        help="rotate frames like the live Record3D stream")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Roboflow model id or local .onnx file")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="intra-op threads per worker for local models")
+    parser.add_argument("--int8", action="store_true", help="use the int8-quantized local model")
+    args = parser.parse_args()
+
+    analyze_video(args.input_file, args.out, workers=args.workers, chunk_seconds=args.chunk_seconds,
+                  rotate=args.rotate, model=args.model, threads=args.threads, quantized=args.int8)
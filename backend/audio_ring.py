@@ -0,0 +1,75 @@
+import threading
+import time
+
+import numpy as np
+
+from metrics import metrics
+
+
+class AudioRing:
+    """
+    Preallocated float32 ring of mono samples, written by the audio callback and
+    read by one consumer.
+
+    Positions are absolute sample counts since start, so the consumer can tell
+    how far behind it is. If the writer laps unread samples, the oldest ones are
+    dropped, the reader is moved forward and the overrun is counted in
+    `audio_ring_overruns` / `audio_samples_lost`.
+    """
+
+    def __init__(self, capacity, sample_rate=16000):
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+        self.written = 0
+        self.read_position = 0
+        self.written_at = None
+        self._available = threading.Condition()
+
+    def write(self, samples):
+        with self._available:
+            # A block larger than the ring only keeps its newest samples
+            skipped = max(len(samples) - self.capacity, 0)
+            samples = samples[skipped:]
+            count = len(samples)
+            self.written += skipped
+
+            start = self.written % self.capacity
+            first = min(count, self.capacity - start)
+            self.buffer[start:start + first] = samples[:first]
+            self.buffer[:count - first] = samples[first:]
+            self.written += count
+            self.written_at = time.time()
+
+            lost = self.written - self.read_position - self.capacity
+            if lost > 0:
+                self.read_position += lost
+                metrics.incr("audio_ring_overruns")
+                metrics.incr("audio_samples_lost", lost)
+            self._available.notify()
+
+    def available(self):
+        with self._available:
+            return self.written - self.read_position
+
+    def read(self, count, timeout=None):
+        """Waits until `count` samples are unread and returns a copy of them, or None on timeout."""
+        with self._available:
+            if not self._available.wait_for(lambda: self.written - self.read_position >= count, timeout):
+                return None
+            start = self.read_position % self.capacity
+            first = min(count, self.capacity - start)
+            samples = np.concatenate((self.buffer[start:start + first], self.buffer[:count - first]))
+            self.read_position += count
+            return samples
+
+    def time_of(self, position):
+        """Approximate wall-clock time a sample position was captured, from the latest write."""
+        with self._available:
+            if self.written_at is None:
+                return None
+            return self.written_at - (self.written - position) / self.sample_rate
+
+    def clear(self):
+        with self._available:
+            self.read_position = self.written
@@ -0,0 +1,126 @@
+import threading
+import time
+import wave
+
+import numpy as np
+
+PA_CONTINUE = 0  # pyaudio.paContinue
+
+
+def load_wav(path, sample_rate=16000):
+    """Reads a PCM WAV file as mono float32 in [-1, 1], resampled to `sample_rate`."""
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width: {width * 8} bits")
+
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate, sample_rate)
+
+
+def resample(samples, rate, target_rate):
+    if rate == target_rate:
+        return samples.astype(np.float32)
+    count = int(len(samples) * target_rate / rate)
+    positions = np.arange(count) * rate / target_rate
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class ReplayStream:
+    """
+    PyAudio-style input stream that plays a float32 array instead of a
+    microphone, paced at `speed` times real time. With a `stream_callback` the
+    blocks are delivered from a thread, as PortAudio does; otherwise `read`
+    blocks like a real stream. `finished` is set once the array is exhausted.
+    """
+
+    def __init__(self, samples, rate, frames_per_buffer, stream_callback=None, speed=1.0):
+        self.samples = samples
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.stream_callback = stream_callback
+        self.speed = speed
+        self.position = 0
+        self.finished = threading.Event()
+        self.started = None
+        self.running = False
+        self.thread = None
+        self.start_stream()
+
+    def start_stream(self):
+        self.running = True
+        self.started = time.perf_counter()
+        if self.stream_callback and self.thread is None:
+            self.thread = threading.Thread(target=self._play, name="audio-replay", daemon=True)
+            self.thread.start()
+
+    def _next_block(self, frame_count):
+        block = self.samples[self.position:self.position + frame_count]
+        self.position += len(block)
+        # Hand the block over when a sound card would have finished capturing it
+        delay = self.started + self.position / (self.rate * self.speed) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if self.position >= len(self.samples):
+            self.finished.set()
+        return block
+
+    def _play(self):
+        while self.running and not self.finished.is_set():
+            block = self._next_block(self.frames_per_buffer)
+            _, flag = self.stream_callback(block.tobytes(), len(block), {}, 0)
+            if flag != PA_CONTINUE:
+                break
+        self.finished.set()
+
+    def read(self, num_frames, exception_on_overflow=True):
+        """Blocking read; returns a short (possibly empty) block once the array is exhausted."""
+        return self._next_block(num_frames).tobytes()
+
+    def is_active(self):
+        return self.running and not self.finished.is_set()
+
+    def stop_stream(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+
+    def close(self):
+        self.stop_stream()
+
+
+class ReplayAudio:
+    """
+    Stand-in for `pyaudio.PyAudio` whose input streams replay an array (or a
+    WAV file) instead of recording, so SimpleSpeechToText can run without a
+    microphone: `SimpleSpeechToText(audio=ReplayAudio.from_file("clip.wav"))`.
+    """
+
+    def __init__(self, samples, sample_rate=16000, speed=1.0):
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.stream = None
+
+    @classmethod
+    def from_file(cls, path, speed=1.0, sample_rate=16000):
+        return cls(load_wav(path, sample_rate), sample_rate, speed)
+
+    def open(self, rate=16000, frames_per_buffer=1024, stream_callback=None, **kwargs):
+        samples = resample(self.samples, self.sample_rate, rate)
+        self.stream = ReplayStream(samples, rate, frames_per_buffer, stream_callback, self.speed)
+        return self.stream
+
+    def terminate(self):
+        if self.stream:
+            self.stream.close()
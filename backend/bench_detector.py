@@ -0,0 +1,96 @@
+"""
+Benchmarks the local ONNX detector in fp32 and int8 on motion frames from a
+recorded video, reporting per-frame latency and how closely the int8 model's
+detections agree with fp32.
+
+Usage:
+    python bench_detector.py model.onnx match.mp4 --frames 300 --threads 4
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from detectors import OnnxDetector
+from motion import MotionDetector
+from pipeline import prepare_frame
+
+
+def motion_frames(video_file, count, rotate=False):
+    cap = cv2.VideoCapture(video_file)
+    motion = MotionDetector(threshold=30)
+
+    def frame_generator():
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield prepare_frame(frame, rotate)
+
+    frames = []
+    for motion_frame in motion._isolated_motion(frame_generator()):
+        frames.append(motion_frame)
+        if len(frames) >= count:
+            break
+    cap.release()
+    return frames
+
+
+def run(detector, frames, confidence, nms_threshold):
+    latencies = []
+    results = []
+    for frame in frames:
+        started = time.perf_counter()
+        detections = detector.detect(frame, confidence=confidence).with_nms(threshold=nms_threshold)
+        latencies.append(time.perf_counter() - started)
+        results.append(detections)
+    return np.array(latencies) * 1000, results
+
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """Fraction of reference boxes matched by a same-class candidate box, and vice versa."""
+    import supervision as sv
+
+    matched_reference = matched_candidate = total_reference = total_candidate = 0
+    for ref, cand in zip(reference, candidate):
+        total_reference += len(ref)
+        total_candidate += len(cand)
+        if len(ref) == 0 or len(cand) == 0:
+            continue
+        iou = sv.box_iou_batch(ref.xyxy, cand.xyxy)
+        iou[ref.class_id[:, None] != cand.class_id[None, :]] = 0
+        matched_reference += int((iou.max(axis=1) >= iou_threshold).sum())
+        matched_candidate += int((iou.max(axis=0) >= iou_threshold).sum())
+
+    recall = matched_reference / total_reference if total_reference else 1.0
+    precision = matched_candidate / total_candidate if total_candidate else 1.0
+    return recall, precision
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="fp32 vs int8 detector benchmark")
+    parser.add_argument("model")
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--confidence", type=float, default=0.3)
+    parser.add_argument("--nms", type=float, default=0.3)
+    parser.add_argument("--rotate", action="store_true")
+    args = parser.parse_args()
+
+    frames = motion_frames(args.video, args.frames, args.rotate)
+    print(f"{len(frames)} motion frames from {args.video}")
+
+    outputs = {}
+    for variant, quantized in (("fp32", False), ("int8", True)):
+        detector = OnnxDetector(args.model, threads=args.threads, quantized=quantized)
+        run(detector, frames[:5], args.confidence, args.nms)  # warm up
+        latencies, outputs[variant] = run(detector, frames, args.confidence, args.nms)
+        print(f"{variant}: load {detector.load_time * 1000:.0f}ms, "
+              f"mean {latencies.mean():.1f}ms, p50 {np.percentile(latencies, 50):.1f}ms, "
+              f"p95 {np.percentile(latencies, 95):.1f}ms, "
+              f"{sum(len(d) for d in outputs[variant])} detections")
+
+    recall, precision = agreement(outputs["fp32"], outputs["int8"])
+    print(f"int8 vs fp32: {recall:.1%} of fp32 boxes recovered, {precision:.1%} of int8 boxes confirmed")
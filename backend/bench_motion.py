@@ -0,0 +1,96 @@
+"""
+Benchmarks MotionDetector modes on a recorded video: per-frame mask cost and
+mask sparsity (fraction of pixels marked as moving). Downscaled differencing
+is also scored against the full-resolution differencing masks.
+
+Usage:
+    python bench_motion.py match.mp4 --frames 500
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from motion import MotionDetector
+from pipeline import prepare_frame
+
+CONFIGURATIONS = [
+    ("diff", {"threshold": 30, "mode": "diff"}),
+    ("diff/2", {"threshold": 30, "mode": "diff", "downscale": 2}),
+    ("diff/4", {"threshold": 30, "mode": "diff", "downscale": 4}),
+    ("average/4", {"threshold": 30, "mode": "average", "downscale": 4}),
+    ("mog2/4", {"threshold": 30, "mode": "mog2", "downscale": 4}),
+]
+
+
+def load_frames(video_file, count, rotate=False, native=False):
+    cap = cv2.VideoCapture(video_file)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame if native else prepare_frame(frame, rotate))
+    cap.release()
+    return frames
+
+
+def measure(detector, frames):
+    """Returns per-frame mask times in ms, the fraction of moving pixels, and the masks."""
+    times = []
+    sparsity = []
+    masks = []
+    for frame in frames:
+        started = time.perf_counter()
+        mask = detector._motion_mask(frame)
+        elapsed = time.perf_counter() - started
+        if mask is None:
+            continue
+        times.append(elapsed * 1000)
+        sparsity.append(cv2.countNonZero(mask) / mask.size)
+        masks.append(mask)
+    return np.array(times), np.array(sparsity), masks
+
+
+def accuracy(reference, masks):
+    """Mean IoU against the reference masks, and the fraction of reference moving pixels recovered."""
+    ious = []
+    recalls = []
+    for ref, mask in zip(reference, masks):
+        ref, mask = ref > 0, mask > 0
+        union = np.count_nonzero(ref | mask)
+        overlap = np.count_nonzero(ref & mask)
+        ious.append(overlap / union if union else 1.0)
+        total = np.count_nonzero(ref)
+        recalls.append(overlap / total if total else 1.0)
+    return np.mean(ious), np.mean(recalls)
+
+
+def report(name, times, sparsity):
+    print(f"{name:>12}: mean {times.mean():6.2f}ms  p95 {np.percentile(times, 95):6.2f}ms  "
+          f"moving pixels {sparsity.mean():.3%} (p95 {np.percentile(sparsity, 95):.3%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Motion mode benchmark")
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--rotate", action="store_true")
+    parser.add_argument("--native", action="store_true",
+                        help="keep the recording's resolution instead of resizing to the pipeline frame")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames, args.rotate, args.native)
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    reference = None
+    for name, options in CONFIGURATIONS:
+        times, sparsity, masks = measure(MotionDetector(**options), frames)
+        report(name, times, sparsity)
+
+        if name == "diff":
+            reference = masks
+        elif options["mode"] == "diff":
+            iou, recall = accuracy(reference, masks)
+            print(f"{'':>12}  vs full resolution: IoU {iou:.3f}, moving pixels recovered {recall:.1%}")
@@ -0,0 +1,145 @@
+"""
+End-to-end speech benchmark without a microphone: replays WAV fixtures through
+SimpleSpeechToText (capture ring, VAD, Whisper) at real-time or accelerated
+speed and reports, per fixture and overall:
+
+    rtf          - Whisper decode time (single and batched) / audio duration
+    latency      - end of speech to transcript callback (p50 / p95)
+    cpu          - process CPU seconds per wall second during the replay
+    wer          - word error rate against `<fixture>.txt`, when present
+
+Results are written as JSON so runs can be compared across builds.
+
+Usage:
+    python bench_replay.py fixtures/ --speed 4 --profile fast --out results.json
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+from audio_source import ReplayAudio, load_wav
+from metrics import metrics
+from speech_to_text import SimpleSpeechToText, LATENCY_PROFILES, SAMPLE_RATE, CHUNK_SIZE
+
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length."""
+    reference, hypothesis = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(len(reference), 1)
+
+
+def replay(path, speed, options):
+    """Runs one fixture through a fresh SimpleSpeechToText; returns its result dict."""
+    samples = load_wav(path, SAMPLE_RATE)
+    duration = len(samples) / SAMPLE_RATE
+    transcripts = []
+
+    audio = ReplayAudio(samples, SAMPLE_RATE, speed)
+    stt = SimpleSpeechToText(callback=transcripts.append, audio=audio, **options)
+    stt.ready.result()
+    metrics.reset()
+
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    stt.start()
+    audio.stream.finished.wait()
+    # At accelerated speeds the worker can lag behind; let it drain the ring first
+    while stt.ring.available() >= CHUNK_SIZE:
+        time.sleep(0.01)
+    stt.stop_recording()  # flushes and transcribes the last utterance
+    wall, cpu = time.perf_counter() - wall_started, time.process_time() - cpu_started
+    stt.cleanup()
+
+    timings = metrics.snapshot()["timings"]
+    decode_s = sum(timings[name]["mean"] * timings[name]["count"]
+                   for name in ("transcribe_s", "transcribe_batch_s") if name in timings)
+    latency = timings.get("speech_end_to_callback_s")
+    result = {
+        "fixture": os.path.basename(path),
+        "duration_s": duration,
+        "transcript": " ".join(transcripts),
+        "rtf": decode_s / duration,
+        "latency_p50_s": latency["p50"] if latency else None,
+        "latency_p95_s": latency["p95"] if latency else None,
+        "cpu": cpu / wall,
+        "overruns": metrics.snapshot()["counters"].get("audio_ring_overruns", 0),
+        "wer": None,
+    }
+
+    reference_path = os.path.splitext(path)[0] + ".txt"
+    if os.path.exists(reference_path):
+        with open(reference_path) as f:
+            result["wer"] = word_error_rate(f.read(), result["transcript"])
+    return result
+
+
+def summarize(results):
+    def mean(key):
+        values = [result[key] for result in results if result[key] is not None]
+        return sum(values) / len(values) if values else None
+
+    duration = sum(result["duration_s"] for result in results)
+    return {
+        "fixtures": len(results),
+        "duration_s": duration,
+        "rtf": sum(result["rtf"] * result["duration_s"] for result in results) / duration,
+        "latency_p50_s": mean("latency_p50_s"),
+        "latency_p95_s": mean("latency_p95_s"),
+        "cpu": mean("cpu"),
+        "wer": mean("wer"),
+    }
+
+
+def report(name, result):
+    def seconds(value):
+        return f"{value * 1000:6.0f}ms" if value is not None else "     n/a"
+
+    wer = f"{result['wer']:.1%}" if result["wer"] is not None else "n/a"
+    print(f"{name:>24}: RTF {result['rtf']:.3f}  latency p50 {seconds(result['latency_p50_s'])}  "
+          f"p95 {seconds(result['latency_p95_s'])}  CPU {result['cpu']:.2f}  WER {wer}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay benchmark for speech_to_text")
+    parser.add_argument("fixtures", help="directory of .wav files, with optional reference .txt files")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed relative to real time")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--profile", default="balanced", choices=list(LATENCY_PROFILES))
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--out", default=None, help="JSON results file")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.wav")))
+    if not paths:
+        raise SystemExit(f"No .wav files in {args.fixtures}")
+
+    config = {"model": args.model, "profile": args.profile, "streaming": args.streaming,
+              "quantized": args.int8, "threads": args.threads, "speed": args.speed}
+    options = {key: config[key] for key in ("profile", "streaming", "quantized", "threads")}
+    results = []
+    for path in paths:
+        results.append(replay(path, args.speed, {"model_size": args.model, **options}))
+        report(results[-1]["fixture"], results[-1])
+
+    summary = summarize(results)
+    report("overall", summary)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": config, "summary": summary, "fixtures": results,
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+        print(f"Results written to {args.out}")
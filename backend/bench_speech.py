@@ -0,0 +1,70 @@
+"""
+Benchmarks Whisper latency profiles on a directory of WAV fixtures: per-file
+decode time and real-time factor (decode time / audio duration, lower is
+better) for each profile, on the fp32 model and optionally the int8 one.
+
+Usage:
+    python bench_speech.py fixtures/ --model tiny --threads 4 --int8
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import torch
+import whisper
+
+from speech_to_text import LATENCY_PROFILES, SAMPLE_RATE, load_whisper_model, decoding_options
+
+
+def load_fixtures(directory):
+    paths = sorted(glob.glob(os.path.join(directory, "*.wav")))
+    return [(os.path.basename(path), whisper.load_audio(path, sr=SAMPLE_RATE)) for path in paths]
+
+
+def measure(model, profile, fixtures):
+    """Returns per-file decode seconds and real-time factors."""
+    options = decoding_options(profile, model)
+    times = []
+    factors = []
+    for name, audio in fixtures:
+        started = time.perf_counter()
+        model.transcribe(audio, language="en", **options)
+        elapsed = time.perf_counter() - started
+        times.append(elapsed)
+        factors.append(elapsed / (len(audio) / SAMPLE_RATE))
+    return np.array(times), np.array(factors)
+
+
+def report(name, times, factors):
+    print(f"{name:>16}: mean {times.mean() * 1000:7.1f}ms  p95 {np.percentile(times, 95) * 1000:7.1f}ms  "
+          f"RTF mean {factors.mean():.3f}  p95 {np.percentile(factors, 95):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Whisper latency profile benchmark")
+    parser.add_argument("fixtures", help="directory of .wav files")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--profiles", nargs="+", default=list(LATENCY_PROFILES), choices=list(LATENCY_PROFILES))
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--int8", action="store_true", help="also benchmark the int8 quantized CPU model")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit(f"No .wav files in {args.fixtures}")
+    duration = sum(len(audio) for _, audio in fixtures) / SAMPLE_RATE
+    print(f"{len(fixtures)} fixtures, {duration:.1f}s of audio, model {args.model}, "
+          f"{torch.get_num_threads()} torch threads")
+
+    variants = [("fp32", False)] + ([("int8", True)] if args.int8 else [])
+    for variant, quantized in variants:
+        model = load_whisper_model(args.model, quantized)
+        # The first decode pays for lazy initialization
+        model.transcribe(fixtures[0][1], language="en", **decoding_options("fast", model))
+        for profile in args.profiles:
+            report(f"{profile}/{variant}", *measure(model, profile, fixtures))
@@ -0,0 +1,176 @@
+"""
+Multi-court server: one deployment serving several courts from a single
+shared detector.
+
+Every court has its own camera, pipeline state (motion, tracker, physics)
+and Game, processed on its own thread. Inference requests from all courts go
+through an InferenceScheduler, which batches them for the shared detector and
+routes the detections back to each court's tracker. Clients pick a court by
+path, e.g. ws://localhost:6767/court/2.
+
+Usage:
+    python courts.py
+"""
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import websockets
+
+from detectors import load_detector, CachedDetector
+from game import Game
+from metrics import metrics
+from motion import MotionDetector
+from pipeline import ShuttlePipeline, prepare_frame
+from protocol import request_path, game_payload, live_payload
+from scheduler import InferenceScheduler
+from streaming import StreamingManager
+
+# Court id -> Record3D device index
+COURTS = {"1": 0, "2": 1}
+MODEL_SOURCE = "badminton-crsqf/1"
+DETECTOR_OPTIONS = {}
+# Reuse detections for byte-identical frames, e.g. {"size": 32, "ttl": 2.0}; None disables it
+INFERENCE_CACHE = None
+MOTION_OPTIONS = {"threshold": 30}
+# Batches close at one frame per court or after this long, whichever comes first
+BATCH_MAX_WAIT_MS = 15
+LATENCY_SLO_MS = 100
+# A court's vision errors are printed once every this many, and all are counted in metrics
+ERROR_LOG_EVERY = 100
+# This many failed frames in a row show the court as "error" until a frame succeeds again
+ERROR_STATUS_AFTER = 30
+HOST = "localhost"
+PORT = 6767
+
+
+class Court:
+    def __init__(self, court_id, device_index):
+        self.court_id = court_id
+        self.device_index = device_index
+        self.game = Game()
+        self.streaming = StreamingManager()
+        self.pipeline = None
+        self.status = "warming_up"
+        self.latest = None
+        self.sequence = 0
+        self.consumed = 0
+        self.errors = 0
+        self.failing = 0  # consecutive frames that failed
+        self._lock = threading.Lock()
+
+    def connect(self, detector):
+        self.streaming.connect_device(dev_idx=self.device_index)
+        self.pipeline = ShuttlePipeline(detector, motion=MotionDetector(**MOTION_OPTIONS))
+        threading.Thread(target=self._capture, name=f"capture-court-{self.court_id}", daemon=True).start()
+        threading.Thread(target=self._process, name=f"vision-court-{self.court_id}", daemon=True).start()
+        self.status = "ready"
+
+    def _capture(self):
+        for rgb_frame, depth_frame, frame_time in self.streaming.get_timed_frames():
+            with self._lock:
+                self.latest = (rgb_frame, frame_time)
+                self.sequence += 1
+
+    def take(self):
+        """Returns the newest unprocessed frame, or None."""
+        with self._lock:
+            if self.latest is None or self.sequence == self.consumed:
+                return None
+            self.consumed = self.sequence
+            return self.latest
+
+    def _process(self):
+        while True:
+            frame = self.take()
+            if frame is None:
+                time.sleep(0.002)
+                continue
+
+            rgb_frame, frame_time = frame
+            # A failed inference (e.g. raised back through the scheduler) costs one frame, not the court
+            try:
+                result = self.pipeline.process(prepare_frame(rgb_frame), frame_time, annotate=False)
+            except Exception as e:
+                self.errors += 1
+                self.failing += 1
+                if self.failing >= ERROR_STATUS_AFTER:
+                    self.status = "error"
+                metrics.incr(f"vision_errors.court{self.court_id}")
+                if self.errors % ERROR_LOG_EVERY == 1:
+                    print(f"Court {self.court_id}: vision error ({self.errors} so far): {e}")
+                continue
+            self.failing = 0
+            self.status = "ready"
+            metrics.observe(f"capture_to_result_s.court{self.court_id}", time.time() - frame_time)
+            if result and result["point"]:
+                self.game.add_point(result["point"] - 1)
+                print(f"Court {self.court_id}: point to team {result['point']}")
+
+    def payload(self):
+        if self.pipeline is None:
+            return game_payload(self.game, None, None, self.status)
+        return live_payload(self.game, self.pipeline.physics, self.status)
+
+
+class CourtRegistry:
+    """Courts sharing one detector through a batching inference scheduler."""
+
+    def __init__(self, courts, detector=None):
+        self.courts = {court_id: Court(court_id, device_index) for court_id, device_index in courts.items()}
+        self.detector = detector
+        self.scheduler = None
+
+    def start(self):
+        if self.detector is None:
+            self.detector = load_detector(MODEL_SOURCE, **DETECTOR_OPTIONS)
+            if INFERENCE_CACHE:
+                self.detector = CachedDetector(self.detector, **INFERENCE_CACHE)
+        self.scheduler = InferenceScheduler(self.detector, max_batch=max(len(self.courts), 1),
+                                            max_wait_ms=BATCH_MAX_WAIT_MS, slo_ms=LATENCY_SLO_MS).start()
+        for court in self.courts.values():
+            # A missing or failing device only takes its own court down
+            try:
+                court.connect(self.scheduler.client(f"court{court.court_id}"))
+            except Exception as e:
+                court.status = "error"
+                metrics.incr("court_connect_failures")
+                print(f"Court {court.court_id}: could not connect device {court.device_index}: {e}")
+
+
+registry = CourtRegistry(COURTS)
+
+
+async def send_coordinates(websocket):
+    path = urlparse(request_path(websocket)).path
+    try:
+        if path == "/metrics":
+            while True:
+                await websocket.send(json.dumps(metrics.snapshot()))
+                await asyncio.sleep(1)
+
+        # The bare path keeps the single-court frontend working against the first court
+        court_id = path.rstrip("/").rsplit("/", 1)[-1] or next(iter(registry.courts))
+        court = registry.courts.get(court_id)
+        if court is None:
+            await websocket.close(code=4004, reason=f"Unknown court {court_id!r}")
+            return
+
+        while True:
+            await websocket.send(json.dumps(court.payload()))
+            await asyncio.sleep(0.1)
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+
+async def main():
+    async with websockets.serve(send_coordinates, HOST, PORT):
+        print(f"Serving courts {', '.join(registry.courts)} on port {PORT}")
+        await asyncio.to_thread(registry.start)
+        await asyncio.Future()  # courts run on their own threads
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+import copy
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from metrics import metrics
+
+DEFAULT_MODEL = "badminton-crsqf/1"
+
+
+class RoboflowDetector:
+    """Detector served through the `inference` package (`get_model`)."""
+
+    def __init__(self, model_id=DEFAULT_MODEL):
+        from inference import get_model
+
+        self.model_id = model_id
+        self.model = get_model(model_id)
+
+    def detect(self, frame, confidence=0.3):
+        import supervision as sv
+
+        result = self.model.infer(frame, confidence=confidence)[0]
+        return sv.Detections.from_inference(result)
+
+    def detect_batch(self, frames, confidence=0.3):
+        import supervision as sv
+
+        results = self.model.infer(list(frames), confidence=confidence)
+        return [sv.Detections.from_inference(result) for result in results]
+
+
+class OnnxDetector:
+    """
+    Local CPU detector for a YOLO-style ONNX export (output shaped
+    `(1, 4 + num_classes, num_boxes)`), run with onnxruntime.
+
+    The optimized graph is cached next to the model (or in `cache_dir`) so
+    later cold starts skip graph optimization. With `quantized=True` an int8
+    dynamically-quantized copy of the model is created (again whenever the
+    model file is newer) and used instead.
+    """
+
+    def __init__(self, model_path, class_names=None, threads=None, quantized=False, cache_dir=None):
+        import onnxruntime as ort
+
+        self.class_names = class_names
+        cache_dir = cache_dir or os.path.dirname(os.path.abspath(model_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        name = os.path.splitext(os.path.basename(model_path))[0]
+
+        if quantized:
+            quantized_path = os.path.join(cache_dir, f"{name}.int8.onnx")
+            # Re-quantize when the source model was replaced since the int8 copy was made
+            if not os.path.exists(quantized_path) or os.path.getmtime(quantized_path) < os.path.getmtime(model_path):
+                quantize_model(model_path, quantized_path)
+            model_path = quantized_path
+            name += ".int8"
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+
+        optimized_path = os.path.join(cache_dir, f"{name}.opt.onnx")
+        if os.path.exists(optimized_path) and os.path.getmtime(optimized_path) >= os.path.getmtime(model_path):
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            model_path = optimized_path
+        else:
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.optimized_model_filepath = optimized_path
+
+        started = time.perf_counter()
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.load_time = time.perf_counter() - started
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[2:4]
+        # Dynamic axes come back as strings or None; size those per frame instead
+        self.input_size = (width, height) if isinstance(width, int) and isinstance(height, int) else None
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+    def _letterbox(self, frame):
+        height, width = frame.shape[:2]
+        if self.input_size:
+            input_width, input_height = self.input_size
+        else:
+            input_width, input_height = -(-width // 32) * 32, -(-height // 32) * 32
+
+        scale = min(input_width / width, input_height / height)
+        resized_width, resized_height = round(width * scale), round(height * scale)
+        left, top = (input_width - resized_width) // 2, (input_height - resized_height) // 2
+
+        canvas = np.full((input_height, input_width, 3), 114, dtype=np.uint8)
+        canvas[top:top + resized_height, left:left + resized_width] = cv2.resize(frame, (resized_width, resized_height))
+        blob = cv2.dnn.blobFromImage(canvas, 1 / 255, swapRB=True)
+        return blob, scale, left, top
+
+    def detect(self, frame, confidence=0.3):
+        blob, scale, left, top = self._letterbox(frame)
+        predictions = self.session.run(None, {self.input_name: blob})[0][0]
+        return self._decode(predictions, frame, scale, left, top, confidence)
+
+    def detect_batch(self, frames, confidence=0.3):
+        """One forward pass for all frames when the export has a dynamic batch axis and a fixed input size."""
+        if not (self.dynamic_batch and self.input_size) or len(frames) < 2:
+            return [self.detect(frame, confidence) for frame in frames]
+
+        letterboxed = [self._letterbox(frame) for frame in frames]
+        batch = np.concatenate([blob for blob, _, _, _ in letterboxed])
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        return [self._decode(predictions, frame, scale, left, top, confidence)
+                for predictions, frame, (_, scale, left, top) in zip(outputs, frames, letterboxed)]
+
+    def _decode(self, predictions, frame, scale, left, top, confidence):
+        import supervision as sv
+
+        predictions = predictions.T
+        scores = predictions[:, 4:]
+        class_id = scores.argmax(axis=1)
+        class_confidence = scores[np.arange(len(scores)), class_id]
+        keep = class_confidence >= confidence
+        boxes, class_id, class_confidence = predictions[keep, :4], class_id[keep], class_confidence[keep]
+
+        xyxy = np.empty_like(boxes)
+        xyxy[:, 0] = (boxes[:, 0] - boxes[:, 2] / 2 - left) / scale
+        xyxy[:, 1] = (boxes[:, 1] - boxes[:, 3] / 2 - top) / scale
+        xyxy[:, 2] = (boxes[:, 0] + boxes[:, 2] / 2 - left) / scale
+        xyxy[:, 3] = (boxes[:, 1] + boxes[:, 3] / 2 - top) / scale
+        height, width = frame.shape[:2]
+        np.clip(xyxy, 0, [width, height, width, height], out=xyxy)
+
+        data = {}
+        if self.class_names:
+            data["class_name"] = np.array(self.class_names)[class_id]
+        return sv.Detections(xyxy=xyxy, confidence=class_confidence, class_id=class_id, data=data)
+
+
+class CachedDetector:
+    """
+    LRU cache in front of a detector, keyed by a digest of the frame's bytes.
+
+    Only byte-identical frames seen within `ttl` seconds reuse the earlier
+    detections: a motion frame of an idle court is all zeros, so idle periods
+    and repeated frames cost a hash and a lookup. Any change, even a few
+    pixels of a distant shuttle, is a miss, so the cache never serves boxes
+    for a frame it didn't run inference on.
+    """
+
+    def __init__(self, detector, size=32, ttl=2.0):
+        self.detector = detector
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def frame_hash(self, frame):
+        return hashlib.blake2b(np.ascontiguousarray(frame).data, digest_size=16).digest()
+
+    def _lookup(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def detect(self, frame, confidence=0.3):
+        now = time.monotonic()
+        key = (self.frame_hash(frame), frame.shape, confidence)
+
+        detections = self._lookup(key, now)
+        if detections is not None:
+            self.hits += 1
+            metrics.incr("inference_cache_hits")
+            return copy.deepcopy(detections)
+
+        self.misses += 1
+        metrics.incr("inference_cache_misses")
+        detections = self.detector.detect(frame, confidence=confidence)
+        self._store(key, detections, now)
+        return detections
+
+    def _store(self, key, detections, now):
+        self.entries[key] = (copy.deepcopy(detections), now)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def detect_batch(self, frames, confidence=0.3):
+        """Serves hits from the cache and sends only the misses to the wrapped detector as one batch."""
+        now = time.monotonic()
+        keys = [(self.frame_hash(frame), frame.shape, confidence) for frame in frames]
+        results = [self._lookup(key, now) for key in keys]
+
+        misses = [i for i, detections in enumerate(results) if detections is None]
+        self.hits += len(frames) - len(misses)
+        self.misses += len(misses)
+        metrics.incr("inference_cache_hits", len(frames) - len(misses))
+        metrics.incr("inference_cache_misses", len(misses))
+
+        results = [None if detections is None else copy.deepcopy(detections) for detections in results]
+        if misses:
+            fresh = self.detector.detect_batch([frames[i] for i in misses], confidence=confidence)
+            for i, detections in zip(misses, fresh):
+                self._store(keys[i], detections, now)
+                results[i] = detections
+        return results
+
+
+def quantize_model(model_path, output_path):
+    """Writes an int8 dynamically-quantized copy of an ONNX model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f"Quantizing {model_path} to int8")
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+
+
+def load_detector(source=DEFAULT_MODEL, **options):
+    """Loads a local ONNX detector for `.onnx` paths, otherwise a Roboflow model id."""
+    if source.endswith(".onnx"):
+        return OnnxDetector(source, **options)
+    return RoboflowDetector(source)
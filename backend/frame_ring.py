@@ -0,0 +1,66 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class FrameRing:
+    """
+    Fixed-size ring of frames in shared memory, written by one process and read
+    zero-copy by others.
+
+    Layout: an int64 header `[latest_seq, slot_seq[0..slots)]`, one float64
+    capture timestamp per slot, then `slots` frames of `shape`. A slot's
+    sequence number is cleared while it is being written, so readers can tell
+    a finished frame from a torn one and, after using a view, whether the
+    writer has lapped them (`is_current`).
+    """
+
+    def __init__(self, name=None, slots=8, shape=(480, 640, 3), create=False):
+        self.slots = slots
+        self.shape = tuple(shape)
+        header_bytes = 8 * (1 + slots) + 8 * slots
+        frame_bytes = int(np.prod(self.shape))
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=header_bytes + slots * frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+        self.sequence = np.ndarray((1 + slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf, offset=8 * (1 + slots))
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.sequence[:] = 0
+
+    def write(self, frame, timestamp):
+        seq = int(self.sequence[0]) + 1
+        slot = seq % self.slots
+        self.sequence[1 + slot] = 0
+        self.frames[slot] = frame
+        self.timestamps[slot] = timestamp
+        self.sequence[1 + slot] = seq
+        self.sequence[0] = seq
+        return seq
+
+    def latest(self, after=0):
+        """Returns `(seq, frame_view, timestamp)` for the newest frame newer than `after`, else None."""
+        seq = int(self.sequence[0])
+        if seq <= after:
+            return None
+        slot = seq % self.slots
+        if self.sequence[1 + slot] != seq:
+            return None
+        return seq, self.frames[slot], float(self.timestamps[slot])
+
+    def is_current(self, seq):
+        """True while the slot holding `seq` has not been overwritten."""
+        return self.sequence[1 + seq % self.slots] == seq
+
+    def close(self):
+        # Drop the views before releasing the mapping
+        del self.sequence, self.timestamps, self.frames
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
@@ -1,9 +1,34 @@
+import json
+import os
+import time
+from bisect import bisect_right
+
 from team import Team
 
+# A snapshot of the score is kept every this many events, bounding replay cost
+SNAPSHOT_INTERVAL = 50
+# Events that start a new scoring action: undo takes back everything from one of these on
+ACTIONS = ("point", "set_points", "set_end", "config")
 
-class Game:
 
-    def __init__(self, points_to_win=21, best_of_sets=3, deuce_enabled=True):
+class Game:
+    """
+    Badminton score kept as an append-only event log.
+
+    Every change is an event (`point`, `set_points`, `set_end`, `reset`,
+    `config`, `undo`, `redo`) applied to the current score as it is appended.
+    Undo and redo are O(1): each scoring action remembers the score before it,
+    and the `undo`/`redo` events record the score they restore. Every
+    SNAPSHOT_INTERVAL events the score is snapshotted, so `state_at` replays
+    at most that many events.
+
+    With `log_path`, events are appended to a JSON-lines file as they happen
+    and an existing file is replayed on startup, so a crash loses neither the
+    score nor the undo/redo history. A torn last line from a crash is cut off
+    before new events are appended.
+    """
+
+    def __init__(self, points_to_win=21, best_of_sets=3, deuce_enabled=True, log_path=None):
         self.team1 = Team()
         self.team2 = Team()
         self.teams = [self.team1, self.team2]
@@ -14,6 +39,18 @@ class Game:
         self.best_of_sets = best_of_sets
         self.deuce_enabled = deuce_enabled
 
+        self.log = []
+        self.snapshots = [(0, self._state())]
+        self._undo = []
+        self._redo = []
+
+        self.log_path = log_path
+        self._file = None
+        if log_path:
+            if os.path.exists(log_path):
+                self._recover(log_path)
+            self._file = open(log_path, "a")
+
     def sets_to_win(self):
         return self.best_of_sets // 2
 
@@ -23,21 +60,50 @@ class Game:
     def get_sets(self):
         return [self.team1.sets, self.team2.sets]
 
+    def to_dict(self):
+        return {
+            "team1_points": self.team1.points,
+            "team2_points": self.team2.points,
+            "team1_sets": self.team1.sets,
+            "team2_sets": self.team2.sets,
+            "set": self.set,
+            "points_to_win": self.points_to_win,
+            "sets_to_win": self.sets_to_win(),
+            "best_of_sets": self.best_of_sets,
+            "deuce_enabled": self.deuce_enabled,
+            "seq": len(self.log),
+        }
+
     def set_points(self, team1, team2):
-        self.team1.points = team1
-        self.team2.points = team2
+        self._append("set_points", points=[team1, team2])
 
     def add_point(self, team):
-        target = self.teams[team]
-        target.points += 1
-
+        self._append("point", team=team)
         self.update_game()
 
+    def configure(self, points_to_win=None, best_of_sets=None, deuce_enabled=None):
+        changes = {"points_to_win": points_to_win, "best_of_sets": best_of_sets, "deuce_enabled": deuce_enabled}
+        changes = {name: value for name, value in changes.items() if value is not None}
+        if changes:
+            self._append("config", changes=changes)
+
+    def undo(self):
+        """Takes back the last scoring action (including a reset it caused); returns False if there is none."""
+        if not self._undo:
+            return False
+        self._append("undo", state=self._undo[-1])
+        return True
+
+    def redo(self):
+        if not self._redo:
+            return False
+        self._append("redo", state=self._redo[-1])
+        return True
+
     def update_sets(self):
-        for team in self.teams:
+        for index, team in enumerate(self.teams):
             if team.points >= self.points_to_win:
-                team.sets += 1
-                self.new_set()
+                self._append("set_end", team=index)
                 break
 
         self.update_game()
@@ -45,12 +111,104 @@ class Game:
     def update_game(self):
         for team in self.teams:
             if team.sets >= self.sets_to_win():
-                # reset game
-                self.__init__(self.points_to_win, self.best_of_sets, self.deuce_enabled)
-
-    def new_set(self):
-        self.set += 1
-        for team in self.teams:
-            team.points = 0
-
+                self._append("reset")
+                break
 
+    def events(self, since=0):
+        """Events from sequence number `since` on, e.g. for a client resuming its stream."""
+        return self.log[since:]
+
+    def state_at(self, seq):
+        """The score (as to_dict) after the first `seq` events, replayed from the nearest snapshot."""
+        index = bisect_right([start for start, _ in self.snapshots], seq) - 1
+        start, state = self.snapshots[index]
+        replica = Game()
+        replica._restore(state)
+        for event in self.log[start:seq]:
+            replica._apply(event)
+        return {**replica.to_dict(), "seq": seq}
+
+    @classmethod
+    def replay(cls, events, **config):
+        """Rebuilds a game, undo history included, from a list of events, e.g. for analytics on a finished match."""
+        game = cls(**config)
+        for event in events:
+            game._ingest(event)
+        return game
+
+    def _state(self):
+        return [self.team1.points, self.team1.sets, self.team2.points, self.team2.sets, self.set,
+                self.points_to_win, self.best_of_sets, self.deuce_enabled]
+
+    def _restore(self, state):
+        (self.team1.points, self.team1.sets, self.team2.points, self.team2.sets, self.set,
+         self.points_to_win, self.best_of_sets, self.deuce_enabled) = state
+
+    def _apply(self, event):
+        kind = event["type"]
+        if kind == "point":
+            self.teams[event["team"]].points += 1
+        elif kind == "set_points":
+            self.team1.points, self.team2.points = event["points"]
+        elif kind == "set_end":
+            self.teams[event["team"]].sets += 1
+            self.set += 1
+            for team in self.teams:
+                team.points = 0
+        elif kind == "reset":
+            # Match over: start a new one with the same settings
+            for team in self.teams:
+                team.points = 0
+                team.sets = 0
+            self.set = 1
+        elif kind == "config":
+            for name, value in event["changes"].items():
+                setattr(self, name, value)
+        elif kind in ("undo", "redo"):
+            self._restore(event["state"])
+
+    def _ingest(self, event):
+        """Appends and applies an event, keeping the undo/redo stacks in step with it."""
+        kind = event["type"]
+        if kind in ACTIONS:
+            # Remember the score before a new action; a new action discards the redo history
+            self._undo.append(self._state())
+            self._redo.clear()
+        elif kind == "undo":
+            self._redo.append(self._state())
+            self._undo.pop()
+        elif kind == "redo":
+            self._undo.append(self._state())
+            self._redo.pop()
+
+        self.log.append(event)
+        self._apply(event)
+        if len(self.log) % SNAPSHOT_INTERVAL == 0:
+            self.snapshots.append((len(self.log), self._state()))
+
+    def _append(self, kind, **fields):
+        event = {"seq": len(self.log), "type": kind, "time": time.time(), **fields}
+        self._ingest(event)
+        if self._file:
+            self._file.write(json.dumps(event) + "\n")
+            self._file.flush()
+        return event
+
+    def _recover(self, path):
+        """Replays the log at `path` and truncates it after the last complete event."""
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated line")
+                    event = json.loads(line)
+                except ValueError:
+                    break  # torn last line from a crash
+                self._ingest(event)
+                good += len(line)
+
+        if good < os.path.getsize(path):
+            print(f"Truncating torn tail of {path} at byte {good}")
+            os.truncate(path, good)
+        print(f"Recovered game from {path}: {len(self.log)} events")
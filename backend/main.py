@@ -1,99 +1,233 @@
 import asyncio
-import websockets
-import json
-import cv2
+import threading
 import time
-
-from streaming import StreamingManager
-from motion import MotionDetector
-from physics import PhysicsCalculator
-from game import Game
-from inference import get_model
-import supervision as sv
-from trackers import SORTTracker
-
-# Initialize components
-game = Game()
+from urllib.parse import urlparse, parse_qs
+
+# Taken before the remaining imports so startup metrics measure from launch
+STARTED_AT = time.perf_counter()
+
+import websockets  # noqa: E402
+import json  # noqa: E402
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+from streaming import StreamingManager  # noqa: E402
+from motion import MotionDetector  # noqa: E402
+from physics import PhysicsCalculator  # noqa: E402
+from game import Game  # noqa: E402
+from metrics import metrics  # noqa: E402
+from protocol import request_path, live_payload, caption_payload  # noqa: E402
+from tracing import FrameTracer  # noqa: E402
+from preview import PreviewRenderer, make_snapshot  # noqa: E402
+from recorder import VideoRecorder  # noqa: E402
+from pipeline import ShuttlePipeline, prepare_frame, COURT_Y, FRAME_SIZE  # noqa: E402
+from adaptive import QualityController  # noqa: E402
+from detectors import load_detector, CachedDetector  # noqa: E402
+from voice_commands import apply_command  # noqa: E402
+from speech_process import SpeechProcess  # noqa: E402
+
+# Roboflow model id, or a local .onnx export to run offline on the CPU
+MODEL_SOURCE = "badminton-crsqf/1"
+DETECTOR_OPTIONS = {}  # for .onnx: {"threads": 4, "quantized": True, "class_names": [...]}
+# Reuse detections for byte-identical motion frames (an idle court), e.g. {"size": 32, "ttl": 2.0}; None disables it
+INFERENCE_CACHE = None
+DEVICE_INDEX = 0
+
+# Set to a file path, e.g. "match.jsonl", to persist the game's event log and recover the score after a restart
+GAME_LOG = None
+
+# Initialize components; the model and device are brought up by warm_up()
+# once the websocket server is already serving
+game = Game(log_path=GAME_LOG)
 
 streaming = StreamingManager()
-streaming.connect_device(dev_idx=0)
 
 # video_path = "test badminton 1.mp4"
 # video_path = "testdepth2.mp4"
 # cap = cv2.VideoCapture(video_path)
 
 # motion = MotionDetector(threshold=25)
-motion = MotionDetector(threshold=30)
-model = get_model("badminton-crsqf/1")
-
-tracker = SORTTracker(lost_track_buffer=15, minimum_consecutive_frames=5)
+# "diff" for two-frame differencing, or "average"/"mog2" background subtraction;
+# downscale=2 or 4 computes the mask on a 320x240 or 160x120 copy of the 640x480 frame: cheaper per
+# frame, but motion smaller than a few pixels (a distant shuttle) can fall below the threshold
+MOTION_OPTIONS = {"threshold": 30, "mode": "diff"}
+motion = MotionDetector(**MOTION_OPTIONS)
+detector = None
 
 physics = PhysicsCalculator()
 
-path_points = []
-max_path_length = 15
-MAX_LINE_LENGTH = 150
-COURT_Y = 350
+# Per-frame span tracing; press 't' in the preview window to dump a trace
+TRACE_ENABLED = False
+TRACE_BUDGET_MS = 100
+
+tracer = FrameTracer(budget_ms=TRACE_BUDGET_MS, enabled=TRACE_ENABLED)
+
+pipeline = None
+status = "warming_up"
+
+# Headless skips all annotation work; otherwise the preview renders on its own thread
+HEADLESS = False
+PREVIEW_FPS = 15
+
+# Per-frame processing budget for the adaptive inference resolution; None pins full resolution
+TARGET_FRAME_MS = 66
+quality = QualityController(target_ms=TARGET_FRAME_MS) if TARGET_FRAME_MS else None
+
+# Set to a file path to archive the annotated overlay, e.g. "match.mp4"
+RECORD_PATH = None
+RECORD_FPS = 30
+
+# Umpire voice commands ("point left", "point right", "undo") and live captions; needs a
+# microphone and Whisper. Speech runs in its own process so decodes never compete with vision
+VOICE_COMMANDS = False
+SPEECH_MODEL = "tiny"
+# Latency profile ("fast", "balanced", "accurate"), int8 CPU model and torch threads for Whisper
+SPEECH_OPTIONS = {"profile": "fast", "quantized": False, "threads": 2, "streaming": True}
+# Cores to pin the speech process to, e.g. {3}; None leaves scheduling to the OS
+SPEECH_CPUS = None
+speech = None
+speech_metrics = {}
+caption_queues = set()
+
+
+def on_preview_key(key):
+    if key == 't' and tracer.enabled:
+        tracer.dump()
+
+
+def load_model():
+    started = time.perf_counter()
+    loaded = load_detector(MODEL_SOURCE, **DETECTOR_OPTIONS)
+    metrics.gauge("model_load_s", time.perf_counter() - started)
+
+    # The first inference pays for lazy graph/session setup; do it before frames arrive
+    started = time.perf_counter()
+    loaded.detect(np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8), confidence=0.3)
+    metrics.gauge("model_warmup_s", time.perf_counter() - started)
+
+    if INFERENCE_CACHE:
+        loaded = CachedDetector(loaded, **INFERENCE_CACHE)
+    return loaded
+
+
+def connect_device():
+    started = time.perf_counter()
+    streaming.connect_device(dev_idx=DEVICE_INDEX)
+    metrics.gauge("device_connect_s", time.perf_counter() - started)
+
+
+def broadcast_caption(message):
+    for captions in caption_queues:
+        captions.put_nowait(message)
+
+
+async def handle_speech_events():
+    """Applies voice commands to the game and fans captions out to every client."""
+    while True:
+        for event in speech.poll():
+            kind = event[0]
+            if kind == "command":
+                command = event[1]
+                apply_command(game, command)
+                if command["spoken_at"] is not None:
+                    metrics.observe("command_to_scoreboard_s", time.time() - command["spoken_at"])
+                print(f"Voice command: {command['text']}")
+                broadcast_caption(caption_payload("command", command["text"], time.time()))
+            elif kind == "caption":
+                broadcast_caption(caption_payload(*event[1:]))
+            elif kind == "metrics":
+                speech_metrics[event[1]] = event[2]
+            elif kind == "error":
+                print(event[2])
+                speech_metrics[f"{event[1]}_error"] = event[2]
+        await asyncio.sleep(0.01)
+
+
+async def warm_up():
+    """
+    Loads the model and connects the camera concurrently, off the event loop.
+    Returns False, leaving the scoreboard served with status "error", if either fails.
+    """
+    global detector, pipeline, status
+
+    try:
+        detector, _ = await asyncio.gather(
+            asyncio.to_thread(load_model),
+            asyncio.to_thread(connect_device),
+        )
+    except Exception as e:
+        status = "error"
+        metrics.incr("warm_up_failures")
+        print(f"Warm-up failed, serving the scoreboard without tracking: {e}")
+        return False
+    pipeline = ShuttlePipeline(detector, motion=motion, physics=physics, tracer=tracer)
+    status = "ready"
+    metrics.gauge("time_to_ready_s", time.perf_counter() - STARTED_AT)
+    print("Pipeline ready")
+    return True
+
+
+async def send_metrics(websocket):
+    try:
+        while True:
+            await websocket.send(json.dumps({**metrics.snapshot(), **speech_metrics}))
+            await asyncio.sleep(1)
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+
+async def send_events(websocket, path):
+    """Streams the game's event log from ?since=<seq>, so a client can resume or replay the match."""
+    since = parse_qs(urlparse(path).query).get("since", ["0"])[0]
+    since = int(since) if since.isdigit() else 0  # malformed or negative values replay from the start
+    try:
+        while True:
+            events = game.events(since)
+            if events:
+                await websocket.send(json.dumps({"topic": "events", "events": events}))
+                since += len(events)
+            await asyncio.sleep(0.1)
+    except websockets.exceptions.ConnectionClosed:
+        pass
 
 
 async def send_coordinates(websocket):
+    path = request_path(websocket)
+    if path == "/metrics":
+        await send_metrics(websocket)
+        return
+    if urlparse(path).path == "/events":
+        await send_events(websocket, path)
+        return
+
     print("WebSocket connection established")
+    captions = asyncio.Queue()
+    caption_queues.add(captions)
     try:
         while True:
-            if physics.last_position:
-                game_data = {
-                    "x": physics.last_position[0],
-                    "y": physics.last_position[1],
-                    "z": physics.last_position[2],
-                    "timestamp": physics.last_time,
-                    "team1_points": game.team1.points,
-                    "team2_points": game.team2.points,
-                    "team1_sets": game.team1.sets,
-                    "team2_sets": game.team2.sets,
-                    "set": game.set,
-                    "points_to_win": game.points_to_win,
-                    "sets_to_win": game.sets_to_win(),
-                    "best_of_sets": game.best_of_sets,
-                    "deuce_enabled": game.deuce_enabled,
-                }
-                try:
+            game_data = live_payload(game, physics, status)
+            try:
+                while not captions.empty():
+                    await websocket.send(json.dumps(captions.get_nowait()))
+                with tracer.span("websocket_send"):
                     await websocket.send(json.dumps(game_data))
-                except websockets.exceptions.ConnectionClosed:
-                    print("WebSocket connection closed while sending data")
-                    break
+            except websockets.exceptions.ConnectionClosed:
+                print("WebSocket connection closed while sending data")
+                break
             await asyncio.sleep(0.1)
     except Exception as e:
         print(f"Error in send_coordinates: {e}")
     finally:
+        caption_queues.discard(captions)
         print("WebSocket connection closed")
 
 
-async def process_video():
-
-    def draw_text(X, Y, Z, color, line=1):
-        text = f"({X:.2f}, {Y:.2f}, {Z:.2f})"
-        cv2.putText(
-            motion_frame_annotated,
-            text,
-            (int(X), int(Y)),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            fontScale=0.5,
-            color=color,
-            thickness=line
-        )
-        if line:
-            path_points.append((int(X), int(Y)))
-
-            if len(path_points) > max_path_length:
-                path_points.pop(0)
-
-    def calculate_distance(point1, point2):
-        if point2 is None:
-            return 0
-        return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
-
-    frame_generator = streaming.get_frames()
-    while True:
+def track_frames(loop, preview, recorder, stopping):
+    """The tracking loop; runs on its own thread so it never waits on the event loop or the preview windows."""
+    frame_generator = streaming.get_timed_frames()
+    frame_id = 0
+    detected = False
+    while not stopping.is_set():
     # while cap.isOpened():
         # ret, rgbd_frame = cap.read()
         # if not ret:
@@ -103,111 +237,126 @@ async def process_video():
         # depth_frame = rgbd_frame[:, :width // 2]
         # rgb_frame = rgbd_frame[:, width // 2:]
 
+        frame_id += 1
+        tracer.begin_frame(frame_id)
         try:
-            rgb_frame, depth_frame = next(frame_generator)
-            rgb_frame = cv2.rotate(rgb_frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
-            rgb_frame = cv2.resize(rgb_frame, (640, 480))
-            depth_frame = cv2.rotate(depth_frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+            with tracer.span("get_frames", frame_id):
+                rgb_frame, depth_frame, capture_time = next(frame_generator)
+            frame_started = time.perf_counter()
+            with tracer.span("rotate_resize", frame_id):
+                rgb_frame = prepare_frame(rgb_frame)
+                depth_frame = cv2.rotate(depth_frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
         except StopIteration:
-            await asyncio.sleep(0.01)
+            tracer.end_frame(frame_id)
+            time.sleep(0.01)
             continue
 
         if rgb_frame is None or depth_frame is None:
-            await asyncio.sleep(0.01)
+            tracer.end_frame(frame_id)
+            time.sleep(0.01)
             continue
 
         # Generate motion frame
-        motion_frame = None
-        for frame in motion._isolated_motion([rgb_frame]):
-            motion_frame = frame
-            break  # Only process the first motion frame
+        motion_frame = pipeline.motion_frame(rgb_frame, frame_id)
 
         if motion_frame is None:
-            await asyncio.sleep(0.01)
+            tracer.end_frame(frame_id)
             continue
 
-            # for motion_frame in motion._isolated_motion([rgbd_frame]):
-        result = model.infer(motion_frame, confidence=0.3)[0]
-        detections = sv.Detections.from_inference(result).with_nms(threshold=0.3)
-        detections = tracker.update(detections)
-
-        motion_frame_annotated = motion_frame.copy()
-        current_time = time.time()
-
-        last_position = physics.last_position
-        X, Y, Z = [None, None, None]
-
-        shuttles = []
-        if len(detections) > 0:
-            for detection in detections:
-                if detection[3] == 2:
-                    shuttles.append(detection)
-
-        if len(shuttles) > 0:
-            max_conf_idx = max(range(len(shuttles)),
-                               key=lambda i: shuttles[i][3])
-            shuttle = shuttles[max_conf_idx]
-
-            detection_xyxy = shuttle[0]
-            X, Y = (
-                int((detection_xyxy[0] + detection_xyxy[2]) / 2),
-                int((detection_xyxy[1] + detection_xyxy[3]) / 2),
-            )
-
-            if calculate_distance((X, Y),
-                                  last_position) <= MAX_LINE_LENGTH or physics.last_time <= current_time:
-                # hsv_image = cv2.cvtColor(depth_frame, cv2.COLOR_BGR2HSV)
-                # Z = hsv_image[Y, X, 0] / 255
-                # Z = depth_frame[Y, X] / 255
-                Z = 1
-
-                if Z >= 0.15:
-                    draw_text(X, Y, Z, (0, 255, 0), 3)
-                    physics.update_pos((X, Y, Z), current_time)
+        detections = pipeline.detect(motion_frame, frame_id)
+        annotating = preview is not None or recorder is not None
+        # Physics runs on the capture clock so inference jitter doesn't show up as velocity noise
+        result = pipeline.track(detections, capture_time, frame_id, annotate=annotating)
+        metrics.observe("capture_to_result_s", time.time() - capture_time)
+
+        if result["observed"] and not detected:
+            detected = True
+            metrics.gauge("time_to_first_detection_s", time.perf_counter() - STARTED_AT)
+            print(f"First detection {time.perf_counter() - STARTED_AT:.2f}s after launch")
+
+        if result["point"]:
+            # The game belongs to the event loop, where the websocket handlers and voice commands use it
+            loop.call_soon_threadsafe(game.add_point, result["point"] - 1)
+            print(result["point"])
+
+        if annotating:
+            with tracer.span("render", frame_id):
+                snapshot = make_snapshot(rgb_frame, motion_frame, depth_frame,
+                                         result["markers"], pipeline.path_points)
+                if preview:
+                    preview.publish(snapshot)
+                if recorder:
+                    recorder.submit(snapshot)
+        tracer.end_frame(frame_id)
+
+        if quality and quality.observe(time.perf_counter() - frame_started):
+            quality.apply(pipeline)
+
+
+async def process_video():
+    preview = None
+    if not HEADLESS:
+        preview = PreviewRenderer(COURT_Y, max_fps=PREVIEW_FPS, on_key=on_preview_key)
+        preview.start()
+        # HighGUI needs the main thread, which runs the event loop; tracking gets a thread of its own
+        preview_task = asyncio.create_task(preview.display())
+
+    recorder = None
+    if RECORD_PATH:
+        recorder = VideoRecorder(RECORD_PATH, COURT_Y, fps=RECORD_FPS)
+        recorder.start()
+
+    loop = asyncio.get_running_loop()
+    finished = loop.create_future()
+    stopping = threading.Event()
+
+    def finish(error=None):
+        if finished.done():
+            return
+        if error:
+            finished.set_exception(error)
+        else:
+            finished.set_result(None)
 
+    def run():
+        try:
+            track_frames(loop, preview, recorder, stopping)
+        except Exception as e:
+            loop.call_soon_threadsafe(finish, e)
         else:
-            estimated_position = physics.guess_pos(current_time)
-            if estimated_position:
-                X, Y, Z = estimated_position
-                if Z >= 0.15:
-                    if calculate_distance((X, Y),
-                                          last_position) <= 50 or physics.last_time + 1 <= current_time:
-                        draw_text(X, Y, Z, (0, 0, 255), 1)
-                    else:
-                        draw_text(X, Y, Z, (255, 0, 0), 0)
-
-        if X and Y and Z:
-            point_response = physics.check_for_point(X, Y, Z, current_time, COURT_Y)
-            if point_response:
-                game.add_point(point_response - 1)
-                print(point_response)
-
-        for i in range(1, len(path_points)):
-            alpha = i / len(path_points)
-            color = (255 * alpha, 255 * alpha, 255 * alpha)
-            if calculate_distance(path_points[i - 1], path_points[i]) <= MAX_LINE_LENGTH:
-                cv2.line(motion_frame_annotated, path_points[i - 1], path_points[i], color, 2)
-
-        # overlayed_frame = cv2.addWeighted(rgbd_frame, 0.5, motion_frame_annotated, 1, 0)
-        motion_frame_annotated = cv2.rectangle(motion_frame_annotated, (0, COURT_Y), (640, 480), color=(255, 255, 255), thickness=2)
-        overlayed_frame = cv2.addWeighted(rgb_frame, 0.08, motion_frame_annotated, 1, 0)
-        cv2.imshow("Motion Frame", overlayed_frame)
-        cv2.imshow("Depth Frame", depth_frame)
-        # end of to be tabbed
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            # cap.release()
-            cv2.destroyAllWindows()
+            loop.call_soon_threadsafe(finish)
 
-        await asyncio.sleep(0.01)
+    # A daemon thread, so a tracking loop blocked waiting for the camera never holds up shutdown
+    threading.Thread(target=run, name="tracking", daemon=True).start()
+    try:
+        await finished
+    finally:
+        stopping.set()
+        if recorder:
+            recorder.stop()
+        if preview:
+            preview.stop()
+            await preview_task
 
 
 async def main():
-    websocket_server = websockets.serve(send_coordinates, "localhost", 6767)
-    await asyncio.gather(
-        websocket_server,
-        process_video()
-    )
+    global speech
+
+    async with websockets.serve(send_coordinates, "localhost", 6767):
+        metrics.gauge("time_to_serve_s", time.perf_counter() - STARTED_AT)
+        print("WebSocket server listening on port 6767")
+        if VOICE_COMMANDS:
+            speech = SpeechProcess(SPEECH_MODEL, SPEECH_OPTIONS, SPEECH_CPUS).start()
+            speech_task = asyncio.create_task(handle_speech_events())
+        try:
+            if await warm_up():
+                await process_video()
+            else:
+                await asyncio.Future()  # keep serving the score (and voice commands) without tracking
+        finally:
+            if speech:
+                speech_task.cancel()
+                speech.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+import threading
+from collections import deque
+
+
+class Metrics:
+    """
+    Thread-safe process-wide counters, gauges and timing samples. Timings keep
+    only the most recent `window` samples and are summarized on snapshot.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timings = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value):
+        with self._lock:
+            samples = self._timings.get(name)
+            if samples is None:
+                samples = self._timings[name] = deque(maxlen=self.window)
+            samples.append(value)
+
+    def percentile(self, name, q):
+        with self._lock:
+            samples = sorted(self._timings.get(name, ()))
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timings = {name: sorted(samples) for name, samples in self._timings.items()}
+
+        summaries = {}
+        for name, samples in timings.items():
+            if not samples:
+                continue
+            summaries[name] = {
+                "count": len(samples),
+                "mean": sum(samples) / len(samples),
+                "p50": samples[len(samples) // 2],
+                "p95": samples[min(int(0.95 * len(samples)), len(samples) - 1)],
+                "max": samples[-1],
+            }
+        return {"counters": counters, "gauges": gauges, "timings": summaries}
+
+
+metrics = Metrics()
@@ -2,30 +2,109 @@ import cv2
 import numpy as np
 
 
+def create_writer(output_file, fps, frame_size):
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(output_file, fourcc, fps, frame_size)
+
+
 class MotionDetector:
-    def __init__(self, threshold=25):
-        self.threshold = threshold
-        self.prev_gray = None
+    """
+    Isolates moving pixels in a frame stream.
 
-    def _isolated_motion(self, input_stream):
-        for frame in input_stream:
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    Modes:
+        "diff"    - two-frame differencing (the original behaviour)
+        "average" - difference against a running-average background
+        "mog2"    - OpenCV MOG2 background subtraction; `threshold` is its
+                    variance threshold
 
-            if self.prev_gray is None:
-                self.prev_gray = gray_frame
-                continue
+    Every mode computes its mask on a grayscale frame shrunk by `downscale`
+    (keeping the shrunk previous frame/background) and upsamples only the
+    thresholded mask back to full size for masking. The background modes also
+    clean the mask up with a morphological open/dilate.
+    """
 
-            diff_frame = cv2.absdiff(self.prev_gray, gray_frame)
-            _, motion_mask = cv2.threshold(diff_frame, self.threshold, 255, cv2.THRESH_BINARY)
+    MODES = ("diff", "average", "mog2")
 
+    def __init__(self, threshold=25, mode="diff", downscale=1, learning_rate=0.05, history=300):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown motion mode {mode!r}, expected one of {self.MODES}")
+
+        self.threshold = threshold
+        self.mode = mode
+        self.downscale = downscale
+        self.learning_rate = learning_rate
+        self.history = history
+        self.prev_gray = None
+        self.background = None
+        self.subtractor = None
+        # A 2x2 open only removes isolated noise pixels, so a shuttle a few pixels wide survives downscaling
+        self.open_kernel = np.ones((2, 2), np.uint8)
+        self.dilate_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+    def _gray(self, frame):
+        if self.downscale != 1:
+            height, width = frame.shape[:2]
+            frame = cv2.resize(frame, (width // self.downscale, height // self.downscale),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def _upsample(self, motion_mask, frame):
+        height, width = frame.shape[:2]
+        if motion_mask.shape[:2] != (height, width):
+            motion_mask = cv2.resize(motion_mask, (width, height), interpolation=cv2.INTER_NEAREST)
+        return motion_mask
+
+    def _difference_mask(self, frame):
+        gray_frame = self._gray(frame)
+
+        if self.prev_gray is None:
             self.prev_gray = gray_frame
+            return None
+
+        diff_frame = cv2.absdiff(self.prev_gray, gray_frame)
+        _, motion_mask = cv2.threshold(diff_frame, self.threshold, 255, cv2.THRESH_BINARY)
+
+        self.prev_gray = gray_frame
+        return self._upsample(motion_mask, frame)
+
+    def _background_mask(self, frame):
+        gray_frame = self._gray(frame)
+
+        if self.mode == "mog2":
+            if self.subtractor is None:
+                self.subtractor = cv2.createBackgroundSubtractorMOG2(
+                    history=self.history, varThreshold=self.threshold, detectShadows=False)
+                self.subtractor.apply(gray_frame, learningRate=1)
+                return None
+            motion_mask = self.subtractor.apply(gray_frame, learningRate=self.learning_rate)
+        else:
+            gray_float = gray_frame.astype(np.float32)
+            if self.background is None:
+                self.background = gray_float
+                return None
+            diff_frame = cv2.absdiff(gray_float, self.background)
+            cv2.accumulateWeighted(gray_float, self.background, self.learning_rate)
+            _, motion_mask = cv2.threshold(diff_frame, self.threshold, 255, cv2.THRESH_BINARY)
+            motion_mask = motion_mask.astype(np.uint8)
 
-            background = np.zeros_like(frame)
+        motion_mask = cv2.morphologyEx(motion_mask, cv2.MORPH_OPEN, self.open_kernel)
+        motion_mask = cv2.dilate(motion_mask, self.dilate_kernel)
+        return self._upsample(motion_mask, frame)
 
-            motion_pixels = cv2.bitwise_and(frame, frame, mask=motion_mask)
-            frame_with_motion = cv2.add(background, motion_pixels)
+    def _motion_mask(self, frame):
+        """Returns the full-resolution motion mask, or None while the mode is still seeding."""
+        if self.mode == "diff":
+            return self._difference_mask(frame)
+        return self._background_mask(frame)
+
+    def _isolated_motion(self, input_stream):
+        for frame in input_stream:
+            motion_mask = self._motion_mask(frame)
+            if motion_mask is None:
+                continue
 
-            yield frame_with_motion
+            # bitwise_and already zeroes everything outside the mask
+            yield cv2.bitwise_and(frame, frame, mask=motion_mask)
 
     def process_stream(self, video_source=0):
         cap = cv2.VideoCapture(video_source)
@@ -53,9 +132,8 @@ class MotionDetector:
         frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps = int(cap.get(cv2.CAP_PROP_FPS))
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
 
-        out = cv2.VideoWriter(output_file, fourcc, fps, (frame_width, frame_height))
+        out = create_writer(output_file, fps, (frame_width, frame_height))
 
         def frame_generator():
             while True:
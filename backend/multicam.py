@@ -0,0 +1,235 @@
+"""
+Multi-camera capture and fusion for one court.
+
+Each Record3D device is read on its own thread; `MultiCameraCapture` hands
+out sets of frames whose capture times agree within a tolerance. Every
+camera has its own ShuttlePipeline (motion state, tracker, physics) and the
+per-camera vision work for a frame set runs in parallel. `ShuttleFusion`
+back-projects each camera's detection with its depth, `intrinsics` and
+`pose` into a common world frame and merges them into one estimate.
+
+Each device's pose is relative to its own ARKit session, whose origin is
+wherever that phone started tracking. The feeds only share a world frame if
+`world_transforms` maps each device's ARKit frame into a common (court)
+frame; without it the ARKit frames are used as-is, which is only correct if
+the sessions were aligned beforehand (e.g. all started from the same spot).
+
+Usage:
+    python multicam.py 0 1 2
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import metrics
+from pipeline import ShuttlePipeline, prepare_frame, FRAME_SIZE
+from scheduler import InferenceScheduler
+from streaming import StreamingManager
+
+
+class CameraFeed:
+    """One device: a capture thread keeping its latest frame, plus its own pipeline."""
+
+    def __init__(self, device_index, detector, motion_options=None):
+        from motion import MotionDetector
+
+        self.device_index = device_index
+        self.streaming = StreamingManager()
+        self.pipeline = ShuttlePipeline(detector, motion=MotionDetector(**(motion_options or {"threshold": 30})))
+        self.latest = None
+        self.sequence = 0
+        self.native_size = None
+        self.mirrored = False
+        self._lock = threading.Lock()
+
+    def connect(self):
+        self.streaming.connect_device(dev_idx=self.device_index)
+        # StreamingManager flips front (TrueDepth) camera frames horizontally; the intrinsics don't know that
+        self.mirrored = self.streaming.session.get_device_type() == self.streaming.DEVICE_TYPE__TRUEDEPTH
+        threading.Thread(target=self._capture, name=f"capture-{self.device_index}", daemon=True).start()
+
+    def _capture(self):
+        for rgb_frame, depth_frame, frame_time in self.streaming.get_timed_frames():
+            with self._lock:
+                self.latest = (rgb_frame, depth_frame, frame_time)
+                self.sequence += 1
+
+    def take(self):
+        with self._lock:
+            return self.sequence, self.latest
+
+    def process(self, frame):
+        """Runs this camera's pipeline; returns an observation dict or None."""
+        rgb_frame, depth_frame, frame_time = frame
+        height, width = rgb_frame.shape[:2]
+        self.native_size = (width, height)
+
+        result = self.pipeline.process(prepare_frame(rgb_frame), frame_time, annotate=False)
+        if result is None or not result["observed"]:
+            return None
+
+        X, Y, _ = result["position"]
+        u, v = canonical_to_native(X, Y, self.native_size)
+        depth = sample_depth(depth_frame, u, v, self.native_size)  # the depth map is flipped along with the RGB
+        if depth is None:
+            return None
+        if self.mirrored:
+            u = self.native_size[0] - 1 - u  # back to sensor columns, which the intrinsics refer to
+        return {"camera": self.device_index, "pixel": (u, v), "depth": depth, "time": frame_time}
+
+
+def canonical_to_native(X, Y, native_size):
+    """Undoes prepare_frame: the 640x480 resize, then the 90 degree counter-clockwise rotation."""
+    width, height = native_size
+    rotated_x = X * height / FRAME_SIZE[0]
+    rotated_y = Y * width / FRAME_SIZE[1]
+    return width - 1 - rotated_y, rotated_x
+
+
+def sample_depth(depth_frame, u, v, native_size, radius=2):
+    """Median of valid depth (metres) around an RGB pixel, on the lower-resolution depth map."""
+    depth_height, depth_width = depth_frame.shape[:2]
+    x = int(u * depth_width / native_size[0])
+    y = int(v * depth_height / native_size[1])
+    patch = depth_frame[max(y - radius, 0):y + radius + 1, max(x - radius, 0):x + radius + 1]
+    valid = patch[np.isfinite(patch) & (patch > 0)]
+    return float(np.median(valid)) if valid.size else None
+
+
+def quaternion_matrix(qx, qy, qz, qw):
+    return np.array([
+        [1 - 2 * (qy * qy + qz * qz), 2 * (qx * qy - qz * qw), 2 * (qx * qz + qy * qw)],
+        [2 * (qx * qy + qz * qw), 1 - 2 * (qx * qx + qz * qz), 2 * (qy * qz - qx * qw)],
+        [2 * (qx * qz - qy * qw), 2 * (qy * qz + qx * qw), 1 - 2 * (qx * qx + qy * qy)],
+    ])
+
+
+class ShuttleFusion:
+    """
+    Merges per-camera observations into one world-frame position. Cameras are
+    assumed fixed, so each pose is read once at connect time. Poses follow
+    Record3D/ARKit conventions (camera looks down -Z, +Y up), so image
+    coordinates are flipped before applying the pose. Observations are
+    weighted by 1 / depth^2, since depth noise grows with distance.
+
+    `world_transforms` maps a device index to a 4x4 transform from that
+    device's ARKit world frame into the common frame; see the module docstring.
+    """
+
+    def __init__(self, feeds, world_transforms=None):
+        world_transforms = world_transforms or {}
+        unaligned = [feed.device_index for feed in feeds if feed.device_index not in world_transforms]
+        if len(feeds) > 1 and unaligned:
+            print(f"Warning: no world transform for cameras {unaligned}; fusing their ARKit frames as if they "
+                  f"were the same, which only holds if the sessions were aligned")
+
+        self.cameras = {}
+        for feed in feeds:
+            coeffs, pose = feed.streaming.intrinsics, feed.streaming.pose
+            rotation = quaternion_matrix(pose.qx, pose.qy, pose.qz, pose.qw)
+            translation = np.array([pose.tx, pose.ty, pose.tz])
+            if feed.device_index in world_transforms:
+                transform = np.asarray(world_transforms[feed.device_index], dtype=float)
+                rotation, translation = transform[:3, :3] @ rotation, transform[:3, :3] @ translation + transform[:3, 3]
+            self.cameras[feed.device_index] = ((coeffs.fx, coeffs.fy, coeffs.tx, coeffs.ty), rotation, translation)
+
+    def to_world(self, observation):
+        (fx, fy, cx, cy), rotation, translation = self.cameras[observation["camera"]]
+        u, v = observation["pixel"]
+        depth = observation["depth"]
+        camera_point = np.array([(u - cx) * depth / fx, -(v - cy) * depth / fy, -depth])
+        return rotation @ camera_point + translation
+
+    def fuse(self, observations):
+        if not observations:
+            return None
+        points = np.array([self.to_world(observation) for observation in observations])
+        weights = np.array([1 / observation["depth"] ** 2 for observation in observations])
+        return tuple(float(value) for value in (points * weights[:, None]).sum(axis=0) / weights.sum())
+
+
+class MultiCameraCapture:
+    """Opens several devices and yields fused world positions per aligned frame set."""
+
+    def __init__(self, device_indices, detector, tolerance=0.02, motion_options=None, max_wait_ms=10,
+                 world_transforms=None):
+        # Cameras of a frame set are processed concurrently, so their inferences batch together
+        self.scheduler = InferenceScheduler(detector, max_batch=len(device_indices), max_wait_ms=max_wait_ms)
+        self.feeds = [CameraFeed(index, self.scheduler.client(f"camera{index}"), motion_options)
+                      for index in device_indices]
+        self.tolerance = tolerance
+        self.executor = ThreadPoolExecutor(max_workers=len(self.feeds), thread_name_prefix="vision")
+        self.fusion = None
+        self.world_transforms = world_transforms
+        self._consumed = {feed.device_index: 0 for feed in self.feeds}
+
+    def connect(self):
+        self.scheduler.start()
+        for feed in self.feeds:
+            feed.connect()
+        self.fusion = ShuttleFusion(self.feeds, self.world_transforms)
+
+    def frame_set(self, timeout=0.1):
+        """
+        Waits until every camera has a new frame (or `timeout` passes), then
+        returns the frames captured within `tolerance` of the newest one. The
+        set is empty if no camera delivered a frame before the deadline.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            taken = {feed.device_index: feed.take() for feed in self.feeds}
+            fresh = {index: frame for index, (sequence, frame) in taken.items()
+                     if frame is not None and sequence > self._consumed[index]}
+            if len(fresh) == len(self.feeds):
+                break
+            if time.monotonic() >= deadline:
+                if not fresh:
+                    metrics.incr("multicam_empty_frame_sets")
+                    return {}
+                break
+            time.sleep(0.001)
+
+        newest = max(frame[2] for frame in fresh.values())
+        aligned = {index: frame for index, frame in fresh.items() if newest - frame[2] <= self.tolerance}
+        metrics.incr("multicam_unaligned_frames", len(fresh) - len(aligned))
+        for index in aligned:
+            self._consumed[index] = taken[index][0]
+        return aligned
+
+    def step(self):
+        """
+        Processes one aligned frame set; returns `(capture_time, world_position or None)`,
+        or `(None, None)` if no camera delivered a frame in time.
+        """
+        frames = self.frame_set()
+        if not frames:
+            return None, None
+        feeds = {feed.device_index: feed for feed in self.feeds}
+
+        started = time.perf_counter()
+        observations = [observation for observation in self.executor.map(
+            lambda index: feeds[index].process(frames[index]), frames) if observation]
+        metrics.observe("multicam_vision_s", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        position = self.fusion.fuse(observations)
+        metrics.observe("multicam_fusion_s", time.perf_counter() - started)
+        return max(frame[2] for frame in frames.values()), position
+
+
+if __name__ == "__main__":
+    import sys
+
+    from detectors import load_detector
+
+    capture = MultiCameraCapture([int(arg) for arg in sys.argv[1:]] or [0, 1], load_detector())
+    capture.connect()
+    try:
+        while True:
+            capture_time, position = capture.step()
+            if position:
+                print(f"{capture_time:.3f}: ({position[0]:.2f}, {position[1]:.2f}, {position[2]:.2f})")
+    except KeyboardInterrupt:
+        pass
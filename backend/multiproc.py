@@ -0,0 +1,267 @@
+"""
+Multi-process mode: capture, vision and game server each run in their own
+process so OpenCV, inference and websocket fan-out don't share one GIL.
+
+    capture  - owns StreamingManager and writes prepared frames into a
+               shared-memory FrameRing
+    vision   - runs motion, detection, tracking and physics on zero-copy views
+               of the ring and sends compact events to the server
+    server   - owns Game and the websocket clients
+    speech   - optional; voice commands and live captions (see speech_process)
+
+The supervisor (this process) owns the ring and the event queue, and restarts
+any worker that dies. Clients stay connected while capture or vision restart;
+a server restart drops every websocket connection (clients must reconnect),
+but the score survives it through the game's event log.
+
+Usage:
+    python multiproc.py
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+from frame_ring import FrameRing
+from metrics import metrics
+from speech_process import speech_worker
+from pipeline import FRAME_SIZE
+
+RING_SLOTS = 8
+FRAME_SHAPE = (FRAME_SIZE[1], FRAME_SIZE[0], 3)
+EVENT_QUEUE_SIZE = 256
+# Point events wait this long for room in a full event queue before they are dropped and counted
+EVENT_PUT_TIMEOUT = 1.0
+# Event log of the server's Game, as GAME_LOG in main.py, so a restarted server recovers the score.
+# None gives every run its own log in GAME_LOG_DIR; set a fixed path to also resume a match across runs
+GAME_LOG = None
+GAME_LOG_DIR = "game_logs"
+HOST = "localhost"
+PORT = 6767
+
+
+def capture_worker(ring_name, device_index):
+    from streaming import StreamingManager
+    from pipeline import prepare_frame
+
+    ring = FrameRing(ring_name, slots=RING_SLOTS, shape=FRAME_SHAPE)
+    streaming = StreamingManager()
+    streaming.connect_device(dev_idx=device_index)
+
+    for rgb_frame, depth_frame, frame_time in streaming.get_timed_frames():
+        ring.write(prepare_frame(rgb_frame), frame_time)
+
+
+def vision_worker(ring_name, events, model_source, detector_options, motion_options):
+    from detectors import load_detector
+    from motion import MotionDetector
+    from pipeline import ShuttlePipeline
+
+    ring = FrameRing(ring_name, slots=RING_SLOTS, shape=FRAME_SHAPE)
+    pipeline = ShuttlePipeline(load_detector(model_source, **detector_options),
+                               motion=MotionDetector(**motion_options))
+    events.put(("ready",))
+
+    last_seq = 0
+    last_metrics = time.monotonic()
+    while True:
+        latest = ring.latest(last_seq)
+        if latest is None:
+            time.sleep(0.002)
+            continue
+
+        seq, frame, captured_at = latest
+        if seq - last_seq > 1 and last_seq:
+            metrics.incr("frames_skipped", seq - last_seq - 1)
+        last_seq = seq
+
+        motion_frame = pipeline.motion_frame(frame)
+        # The motion frame is a private copy; if the capture process lapped the
+        # slot while we were reading it, the frame was torn and is dropped
+        if not ring.is_current(seq):
+            metrics.incr("frames_torn")
+            continue
+        if motion_frame is None:
+            continue
+
+        result = pipeline.track(pipeline.detect(motion_frame), captured_at, annotate=False)
+        metrics.observe("capture_to_result_s", time.time() - captured_at)
+
+        physics = pipeline.physics
+        if result["observed"]:
+            try:
+                events.put_nowait(("position", physics.last_position, physics.last_velocity, physics.last_time))
+            except queue.Full:
+                metrics.incr("position_events_dropped")
+        if result["point"]:
+            # A point matters more than a position, so wait briefly, but never hang if the server is gone
+            try:
+                events.put(("point", result["point"] - 1), timeout=EVENT_PUT_TIMEOUT)
+            except queue.Full:
+                metrics.incr("point_events_dropped")
+                print(f"Event queue full, dropped point for team {result['point']}")
+
+        if time.monotonic() - last_metrics >= 1:
+            last_metrics = time.monotonic()
+            try:
+                events.put_nowait(("metrics", "vision", metrics.snapshot()))
+            except queue.Full:
+                pass
+
+
+def server_worker(events, host, port, log_path=None):
+    import websockets
+
+    from game import Game
+    from physics import PhysicsCalculator
+    from protocol import request_path, live_payload, caption_payload
+    from voice_commands import apply_command
+
+    game = Game(log_path=log_path)
+    # Mirrors the vision worker's physics state so positions can be extrapolated to send time
+    physics = PhysicsCalculator()
+    state = {"status": "warming_up"}
+    worker_metrics = {}
+    caption_queues = set()
+
+    def broadcast_caption(message):
+        for captions in caption_queues:
+            captions.put_nowait(message)
+
+    def apply(event):
+        kind = event[0]
+        if kind == "position":
+            physics.last_position, physics.last_velocity, physics.last_time = event[1:4]
+        elif kind == "point":
+            game.add_point(event[1])
+            print(event[1] + 1)
+        elif kind == "ready":
+            state["status"] = "ready"
+        elif kind == "restarting":
+            state["status"] = "warming_up"
+        elif kind == "metrics":
+            worker_metrics[event[1]] = event[2]
+        elif kind == "error":
+            print(event[2])
+            worker_metrics[f"{event[1]}_error"] = event[2]
+        elif kind == "caption":
+            broadcast_caption(caption_payload(*event[1:]))
+        elif kind == "command":
+            command = event[1]
+            apply_command(game, command)
+            if command["spoken_at"] is not None:
+                metrics.observe("command_to_scoreboard_s", time.time() - command["spoken_at"])
+            broadcast_caption(caption_payload("command", command["text"], time.time()))
+
+    async def drain_events():
+        while True:
+            drained = 0
+            while drained < 1000:
+                try:
+                    apply(events.get_nowait())
+                except queue.Empty:
+                    break
+                drained += 1
+            metrics.gauge("event_backlog", drained)
+            await asyncio.sleep(0.005)
+
+    async def send_coordinates(websocket):
+        path = request_path(websocket)
+        captions = asyncio.Queue()
+        if path != "/metrics":
+            caption_queues.add(captions)
+        try:
+            while True:
+                if path == "/metrics":
+                    payload = {"server": metrics.snapshot(), **worker_metrics}
+                    interval = 1
+                else:
+                    while not captions.empty():
+                        await websocket.send(json.dumps(captions.get_nowait()))
+                    payload = live_payload(game, physics, state["status"])
+                    interval = 0.1
+                await websocket.send(json.dumps(payload))
+                await asyncio.sleep(interval)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            caption_queues.discard(captions)
+
+    async def serve():
+        async with websockets.serve(send_coordinates, host, port):
+            print(f"WebSocket server listening on port {port}")
+            await drain_events()
+
+    asyncio.run(serve())
+
+
+class Supervisor:
+    """Starts the workers and restarts any that exit, with a short backoff."""
+
+    def __init__(self, model_source="badminton-crsqf/1", detector_options=None, motion_options=None,
+                 device_index=0, host=HOST, port=PORT, speech_model=None, speech_options=None, speech_cpus=None,
+                 game_log=GAME_LOG):
+        self.context = multiprocessing.get_context("spawn")
+        self.ring = FrameRing(slots=RING_SLOTS, shape=FRAME_SHAPE, create=True)
+        self.events = self.context.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.specs = {
+            "server": (server_worker, (self.events, host, port, game_log or self.run_log())),
+            "capture": (capture_worker, (self.ring.name, device_index)),
+            "vision": (vision_worker, (self.ring.name, self.events, model_source,
+                                       detector_options or {}, motion_options or {"threshold": 30})),
+        }
+        if speech_model:
+            self.specs["speech"] = (speech_worker, (self.events, speech_model, speech_options or {}, speech_cpus))
+        self.processes = {}
+        self.restarts = {name: 0 for name in self.specs}
+
+    @staticmethod
+    def run_log():
+        os.makedirs(GAME_LOG_DIR, exist_ok=True)
+        path = os.path.join(GAME_LOG_DIR, f"game-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+        print(f"Game event log: {path}")
+        return path
+
+    def start(self, name):
+        target, args = self.specs[name]
+        process = self.context.Process(target=target, args=args, name=name, daemon=True)
+        process.start()
+        self.processes[name] = process
+        print(f"Started {name} worker (pid {process.pid})")
+
+    def run(self, check_interval=1.0):
+        for name in self.specs:
+            self.start(name)
+
+        try:
+            while True:
+                time.sleep(check_interval)
+                for name, process in list(self.processes.items()):
+                    if process.is_alive():
+                        continue
+                    self.restarts[name] += 1
+                    print(f"{name} worker exited with code {process.exitcode}, "
+                          f"restarting (restart #{self.restarts[name]})")
+                    if name == "vision":
+                        try:
+                            self.events.put_nowait(("restarting",))
+                        except queue.Full:
+                            # The server isn't draining; it is restarted on its own if it died
+                            metrics.incr("restart_events_dropped")
+                    time.sleep(min(self.restarts[name], 5))
+                    self.start(name)
+        except KeyboardInterrupt:
+            print("\nStopping workers...")
+        finally:
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                process.join(timeout=2)
+            self.ring.close()
+            self.ring.unlink()
+
+
+if __name__ == "__main__":
+    Supervisor().run()
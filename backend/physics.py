@@ -52,6 +52,17 @@ class PhysicsCalculator:
             return None
         return None
 
+    def extrapolate(self, timestamp):
+        """
+        Predicts where the shuttle is at `timestamp`, looking at most `timeout`
+        past the last observation; used to bring a capture-time position up
+        to "now" before it is sent to clients.
+        """
+        if self.last_position is None or self.last_time is None:
+            return None
+        estimated_position = self.guess_pos(min(max(timestamp, self.last_time), self.last_time + self.timeout))
+        return estimated_position or self.last_position
+
     def check_for_point(self, X, Y, Z, timestamp, COURT_Y):
         deltatime = timestamp - self.last_point_time
         if Y >= COURT_Y and deltatime > 8:
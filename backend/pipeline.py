@@ -0,0 +1,172 @@
+import cv2
+
+from motion import MotionDetector
+from physics import PhysicsCalculator
+from tracing import FrameTracer
+
+FRAME_SIZE = (640, 480)
+MAX_PATH_LENGTH = 15
+MAX_LINE_LENGTH = 150
+COURT_Y = 350
+SHUTTLE_CLASS_ID = 2
+
+
+def calculate_distance(point1, point2):
+    if point2 is None:
+        return 0
+    return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
+
+
+class ShuttlePipeline:
+    """
+    Per-source tracking state: motion isolation, detection, SORT tracking and
+    physics for one camera feed. Each stage is a separate method so callers
+    can trace, batch or distribute them.
+    """
+
+    def __init__(self, detector, motion=None, tracker=None, physics=None, tracer=None,
+                 confidence=0.3, nms_threshold=0.3):
+        if tracker is None:
+            from trackers import SORTTracker
+            tracker = SORTTracker(lost_track_buffer=15, minimum_consecutive_frames=5)
+
+        self.detector = detector
+        self.motion = motion or MotionDetector(threshold=30)
+        self.tracker = tracker
+        self.physics = physics or PhysicsCalculator()
+        self.tracer = tracer or FrameTracer(enabled=False)
+        self.confidence = confidence
+        self.nms_threshold = nms_threshold
+        self.inference_size = FRAME_SIZE
+        self.path_points = []
+
+    def motion_frame(self, rgb_frame, frame_id=None):
+        with self.tracer.span("motion", frame_id):
+            for frame in self.motion._isolated_motion([rgb_frame]):
+                return frame  # Only process the first motion frame
+        return None
+
+    def inference_input(self, motion_frame):
+        height, width = motion_frame.shape[:2]
+        if self.inference_size != (width, height):
+            return cv2.resize(motion_frame, self.inference_size, interpolation=cv2.INTER_AREA)
+        return motion_frame
+
+    def finish_detections(self, detections, motion_frame):
+        """Applies this pipeline's confidence and NMS, and maps boxes back to the canonical frame space."""
+        if len(detections) > 0 and detections.confidence is not None:
+            detections = detections[detections.confidence >= self.confidence]
+        detections = detections.with_nms(threshold=self.nms_threshold)
+
+        height, width = motion_frame.shape[:2]
+        if self.inference_size != (width, height) and len(detections) > 0:
+            detections.xyxy = detections.xyxy * [
+                width / self.inference_size[0], height / self.inference_size[1],
+                width / self.inference_size[0], height / self.inference_size[1],
+            ]
+        return detections
+
+    def detect(self, motion_frame, frame_id=None):
+        with self.tracer.span("inference", frame_id):
+            detections = self.detector.detect(self.inference_input(motion_frame), confidence=self.confidence)
+            return self.finish_detections(detections, motion_frame)
+
+    def track(self, detections, current_time, frame_id=None, annotate=True):
+        """
+        Updates the tracker and physics with one frame of detections.
+
+        Returns a dict with the shuttle `position` (or None), whether it was
+        `observed` or extrapolated, its `tracker_id`, the `point` side scored
+        on this frame (0 for none) and the preview `markers`.
+        """
+        with self.tracer.span("tracking", frame_id):
+            detections = self.tracker.update(detections)
+
+        physics_span = self.tracer.begin("physics", frame_id)
+        physics = self.physics
+        markers = []
+        tracker_id = None
+        observed = False
+
+        def draw_text(X, Y, Z, color, line=1):
+            if annotate:
+                markers.append((X, Y, Z, color, line))
+            if line:
+                self.path_points.append((int(X), int(Y)))
+
+                if len(self.path_points) > MAX_PATH_LENGTH:
+                    self.path_points.pop(0)
+
+        last_position = physics.last_position
+        X, Y, Z = [None, None, None]
+
+        shuttles = []
+        if len(detections) > 0:
+            for detection in detections:
+                if detection[3] == SHUTTLE_CLASS_ID:
+                    shuttles.append(detection)
+
+        if len(shuttles) > 0:
+            max_conf_idx = max(range(len(shuttles)),
+                               key=lambda i: shuttles[i][3])
+            shuttle = shuttles[max_conf_idx]
+            tracker_id = shuttle[4]
+
+            detection_xyxy = shuttle[0]
+            X, Y = (
+                int((detection_xyxy[0] + detection_xyxy[2]) / 2),
+                int((detection_xyxy[1] + detection_xyxy[3]) / 2),
+            )
+
+            if calculate_distance((X, Y),
+                                  last_position) <= MAX_LINE_LENGTH or physics.last_time <= current_time:
+                # hsv_image = cv2.cvtColor(depth_frame, cv2.COLOR_BGR2HSV)
+                # Z = hsv_image[Y, X, 0] / 255
+                # Z = depth_frame[Y, X] / 255
+                Z = 1
+
+                if Z >= 0.15:
+                    draw_text(X, Y, Z, (0, 255, 0), 3)
+                    physics.update_pos((X, Y, Z), current_time)
+                    observed = True
+
+        else:
+            estimated_position = physics.guess_pos(current_time)
+            if estimated_position:
+                X, Y, Z = estimated_position
+                if Z >= 0.15:
+                    if calculate_distance((X, Y),
+                                          last_position) <= 50 or physics.last_time + 1 <= current_time:
+                        draw_text(X, Y, Z, (0, 0, 255), 1)
+                    else:
+                        draw_text(X, Y, Z, (255, 0, 0), 0)
+
+        point = 0
+        if X and Y and Z:
+            point = physics.check_for_point(X, Y, Z, current_time, COURT_Y)
+        self.tracer.end(physics_span)
+
+        return {
+            "position": (X, Y, Z) if X and Y and Z else None,
+            "observed": observed,
+            "tracker_id": None if tracker_id is None else int(tracker_id),
+            "point": point,
+            "markers": markers,
+        }
+
+    def process(self, rgb_frame, current_time, frame_id=None, annotate=True):
+        """Runs every stage on one frame; returns None while the motion detector is still seeding."""
+        motion_frame = self.motion_frame(rgb_frame, frame_id)
+        if motion_frame is None:
+            return None
+
+        result = self.track(self.detect(motion_frame, frame_id), current_time, frame_id, annotate)
+        result["motion_frame"] = motion_frame
+        return result
+
+
+def prepare_frame(rgb_frame, rotate=True):
+    """Brings a raw camera frame into the canonical frame space the pipeline works in."""
+    if rotate:
+        rgb_frame = cv2.rotate(rgb_frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return cv2.resize(rgb_frame, FRAME_SIZE)
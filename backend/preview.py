@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+
+import cv2
+
+from pipeline import MAX_LINE_LENGTH, calculate_distance
+
+
+def annotate(snapshot, court_y):
+    """Draws the trail, coordinates and court line of a snapshot onto a copy of its motion frame."""
+    motion_frame_annotated = snapshot["motion_frame"].copy()
+
+    for X, Y, Z, color, line in snapshot["markers"]:
+        cv2.putText(
+            motion_frame_annotated,
+            f"({X:.2f}, {Y:.2f}, {Z:.2f})",
+            (int(X), int(Y)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            fontScale=0.5,
+            color=color,
+            thickness=line
+        )
+
+    path_points = snapshot["path_points"]
+    for i in range(1, len(path_points)):
+        alpha = i / len(path_points)
+        color = (255 * alpha, 255 * alpha, 255 * alpha)
+        if calculate_distance(path_points[i - 1], path_points[i]) <= MAX_LINE_LENGTH:
+            cv2.line(motion_frame_annotated, path_points[i - 1], path_points[i], color, 2)
+
+    height, width = motion_frame_annotated.shape[:2]
+    cv2.rectangle(motion_frame_annotated, (0, court_y), (width, height), color=(255, 255, 255), thickness=2)
+    return cv2.addWeighted(snapshot["rgb_frame"], 0.08, motion_frame_annotated, 1, 0)
+
+
+def make_snapshot(rgb_frame, motion_frame, depth_frame, markers, path_points):
+    return {
+        "rgb_frame": rgb_frame,
+        "motion_frame": motion_frame,
+        "depth_frame": depth_frame,
+        "markers": list(markers),
+        "path_points": list(path_points),
+    }
+
+
+class PreviewRenderer(threading.Thread):
+    """
+    Annotates the latest published pipeline state on its own thread at a
+    capped frame rate, so the tracking loop never waits on the drawing.
+
+    Only the newest snapshot is kept; snapshots published faster than
+    `max_fps` are simply overwritten. HighGUI windows must be driven from the
+    main thread (Cocoa refuses otherwise on macOS), so the thread only renders
+    frames; `show` (or the `display` coroutine on the main thread's event
+    loop) puts them on screen and polls the keyboard.
+    """
+
+    def __init__(self, court_y, max_fps=15, on_key=None):
+        super().__init__(name="preview", daemon=True)
+        self.court_y = court_y
+        self.interval = 1 / max_fps
+        self.on_key = on_key
+        self.running = False
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._rendered = None
+
+    def publish(self, snapshot):
+        with self._lock:
+            self._snapshot = snapshot
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def run(self):
+        while self.running:
+            started = time.perf_counter()
+
+            with self._lock:
+                snapshot, self._snapshot = self._snapshot, None
+
+            if snapshot is not None:
+                rendered = (annotate(snapshot, self.court_y), snapshot["depth_frame"])
+                with self._lock:
+                    self._rendered = rendered
+
+            remaining = self.interval - (time.perf_counter() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def show(self):
+        """Displays the newest rendered frames and handles keys; call from the main thread."""
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError("PreviewRenderer.show must run on the main thread")
+
+        with self._lock:
+            rendered, self._rendered = self._rendered, None
+        if rendered is not None:
+            cv2.imshow("Motion Frame", rendered[0])
+            cv2.imshow("Depth Frame", rendered[1])
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            cv2.destroyAllWindows()
+        elif key != 0xFF and self.on_key:
+            self.on_key(chr(key))
+
+    async def display(self):
+        """Runs `show` at the preview rate on the main thread's event loop until stopped."""
+        while self.running:
+            self.show()
+            await asyncio.sleep(self.interval)
+        cv2.destroyAllWindows()
+
+    def stop(self):
+        self.running = False
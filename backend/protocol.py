@@ -0,0 +1,46 @@
+import time
+
+
+def request_path(websocket):
+    """Request path of a websocket connection on both the new and legacy websockets APIs."""
+    request = getattr(websocket, "request", None)
+    if request is not None:
+        return request.path
+    return getattr(websocket, "path", "/")
+
+
+def game_payload(game, position, timestamp, status="ready", capture_timestamp=None):
+    """
+    The JSON message the scoreboard consumes: shuttle position plus the game
+    state. `timestamp` is the instant the position refers to and
+    `capture_timestamp` the capture time of the last frame it was seen in.
+    """
+    X, Y, Z = position or (None, None, None)
+    return {
+        "topic": "game",
+        "status": status,
+        "x": X,
+        "y": Y,
+        "z": Z,
+        "timestamp": timestamp,
+        "capture_timestamp": capture_timestamp,
+        **game.to_dict(),
+    }
+
+
+def caption_payload(kind, text, timestamp):
+    """A live transcript message; `kind` is "partial", "final" or "command"."""
+    return {
+        "topic": "caption",
+        "kind": kind,
+        "text": text,
+        "timestamp": timestamp,
+    }
+
+
+def live_payload(game, physics, status="ready"):
+    """game_payload with the last capture-time position extrapolated to now."""
+    now = time.time()
+    position = physics.extrapolate(now)
+    timestamp = min(now, physics.last_time + physics.timeout) if position else None
+    return game_payload(game, position, timestamp, status, physics.last_time)
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+
+from motion import create_writer
+from metrics import metrics
+from preview import annotate
+
+
+class VideoRecorder(threading.Thread):
+    """
+    Annotates and encodes pipeline snapshots to a video file on a dedicated
+    thread. Snapshots go through a bounded queue; when the encoder falls behind
+    new snapshots are dropped instead of stalling the tracking loop.
+
+    The container has a fixed `fps`, so each snapshot is stamped when it is
+    submitted and frames are repeated or skipped to keep the recording on that
+    clock; gaps from drops or a slow pipeline play back at real speed instead
+    of fast-forwarding. Throughput and drops go to the metrics registry.
+    """
+
+    def __init__(self, output_file, court_y, fps=30, max_queue=64):
+        super().__init__(name="recorder", daemon=True)
+        self.output_file = output_file
+        self.court_y = court_y
+        self.fps = fps
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.writer = None
+
+        self.submitted = 0
+        self.rendered = 0  # snapshots annotated and encoded
+        self.skipped = 0  # snapshots that arrived ahead of the fps clock and were never rendered
+        self.written = 0  # frames in the file, including repeats that keep it on the fps clock
+        self.dropped = 0
+        self._run_started = None
+        self._stopping = threading.Event()
+
+    def submit(self, snapshot):
+        """Queues a snapshot for encoding; returns False if it was dropped."""
+        self.submitted += 1
+        try:
+            self.queue.put_nowait((time.perf_counter(), snapshot))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            metrics.incr("recorder_frames_dropped")
+            return False
+
+    def run(self):
+        self._run_started = time.perf_counter()
+        first_at = None
+        while not (self._stopping.is_set() and self.queue.empty()):
+            try:
+                submitted_at, snapshot = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # Slot of this snapshot on the output clock: skip it if that slot is already written,
+            # fill gaps by repeating it
+            slot = 0 if first_at is None else round((submitted_at - first_at) * self.fps)
+            metrics.gauge("recorder_queue", self.queue.qsize())
+            if slot < self.written:
+                self.skipped += 1
+                continue
+
+            frame = annotate(snapshot, self.court_y)
+            if self.writer is None:
+                height, width = frame.shape[:2]
+                self.writer = create_writer(self.output_file, self.fps, (width, height))
+                first_at = submitted_at
+
+            while self.written <= slot:
+                self.writer.write(frame)
+                self.written += 1
+            self.rendered += 1
+
+            if self.rendered % 30 == 0:
+                metrics.gauge("recorder_encode_fps", self.stats()["encode_fps"])
+
+        if self.writer is not None:
+            self.writer.release()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._run_started if self._run_started else 0
+        return {
+            "written": self.written,
+            "rendered": self.rendered,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+            "encode_fps": self.written / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def stop(self, timeout=None):
+        """Finishes encoding what is already queued and closes the file."""
+        self._stopping.set()
+        self.join(timeout)
+        stats = self.stats()
+        print(f"Recording saved to {self.output_file}: {stats['written']} frames at {stats['encode_fps']:.1f} fps "
+              f"from {stats['rendered']} snapshots ({stats['skipped']} skipped on the {self.fps} fps clock, "
+              f"{stats['dropped']} dropped)")
+        return stats
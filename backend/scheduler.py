@@ -0,0 +1,110 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import metrics
+
+
+class InferenceScheduler:
+    """
+    Collects inference requests from several frame sources (cameras, courts)
+    into micro-batches for one shared detector.
+
+    A batch is dispatched as soon as it holds `max_batch` frames or the oldest
+    request has waited `max_wait_ms`, whichever comes first. Each source gets a
+    `client(source_id)` with the usual `detect(frame, confidence)` signature,
+    so pipelines use the scheduler without knowing about it.
+
+    Per source, request latency (submit to result) is recorded and compared to
+    `slo_ms`; batch size and fill ratio are recorded per batch, so `max_batch`
+    can be tuned against latency.
+    """
+
+    def __init__(self, detector, max_batch=8, max_wait_ms=10, slo_ms=100):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.slo = slo_ms / 1000 if slo_ms else None
+        self.requests = queue.Queue()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+
+    def submit(self, source_id, frame, confidence=0.3):
+        future = Future()
+        self.requests.put((source_id, frame, confidence, time.perf_counter(), future))
+        return future
+
+    def client(self, source_id):
+        return SchedulerClient(self, source_id)
+
+    def _collect(self):
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = batch[0][3] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            dispatched = time.perf_counter()
+            confidence = min(request[2] for request in batch)
+            try:
+                results = self.detector.detect_batch([request[1] for request in batch], confidence=confidence)
+            except Exception as e:
+                for request in batch:
+                    request[4].set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            metrics.observe("inference_batch_size", len(batch))
+            metrics.observe("inference_batch_fill", len(batch) / self.max_batch)
+            metrics.observe("inference_batch_s", finished - dispatched)
+
+            for (source_id, _, request_confidence, submitted, future), detections in zip(batch, results):
+                if request_confidence > confidence and len(detections) > 0:
+                    detections = detections[detections.confidence >= request_confidence]
+                latency = finished - submitted
+                metrics.observe(f"inference_latency_s.{source_id}", latency)
+                metrics.observe(f"inference_queue_wait_s.{source_id}", dispatched - submitted)
+                if self.slo is not None and latency > self.slo:
+                    metrics.incr(f"inference_slo_misses.{source_id}")
+                future.set_result(detections)
+
+
+class SchedulerClient:
+    """Detector-compatible handle that routes one source's frames through the scheduler."""
+
+    def __init__(self, scheduler, source_id):
+        self.scheduler = scheduler
+        self.source_id = source_id
+
+    def detect(self, frame, confidence=0.3):
+        return self.scheduler.submit(self.source_id, frame, confidence).result()
+
+    def detect_batch(self, frames, confidence=0.3):
+        futures = [self.scheduler.submit(self.source_id, frame, confidence) for frame in frames]
+        return [future.result() for future in futures]
@@ -0,0 +1,114 @@
+"""
+Speech recognition as a sibling process of the vision pipeline.
+
+Whisper decodes are CPU-heavy and would compete with detection for the GIL
+and cores, so SimpleSpeechToText runs in its own spawned process with a
+fixed torch thread budget and, optionally, pinned to its own cores. It reports
+back over a queue:
+
+    ("caption", kind, text, timestamp)   kind is "partial" or "final"
+    ("command", command)                 a recognized scoring command
+    ("metrics", "speech", snapshot)      once per second
+    ("error", "speech", message)         Whisper or the microphone failed to start
+
+The queue may be bounded (multiproc shares its event queue), so captions and
+metrics are dropped rather than blocking when it is full.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+
+class _CommandForwarder:
+    """command_queue stand-in that forwards recognized commands to the parent."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def put(self, command):
+        try:
+            self.events.put(("command", command), timeout=1.0)
+        except queue.Full:
+            print(f"Event queue full, dropped command: {command['text']}")
+
+
+def speech_worker(events, model_size, options, cpus=None):
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    from metrics import metrics
+
+    def send(event):
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            metrics.incr("speech_events_dropped")
+
+    def report_error(message):
+        print(message)
+        try:
+            events.put(("error", "speech", message), timeout=1.0)
+        except queue.Full:
+            pass
+
+    def publish(kind):
+        return lambda text: send(("caption", kind, text, time.time()))
+
+    def report_metrics():
+        while True:
+            time.sleep(1)
+            send(("metrics", "speech", metrics.snapshot()))
+
+    try:
+        from speech_to_text import SimpleSpeechToText
+
+        stt = SimpleSpeechToText(model_size=model_size, callback=publish("final"), partial_callback=publish("partial"),
+                                 command_queue=_CommandForwarder(events), **options)
+        started = stt.start()
+    except Exception as e:
+        report_error(f"Speech recognition failed to start: {e}")
+        return
+    if not started:
+        stt.cleanup()
+        report_error("Speech recognition failed to start: no Whisper model or microphone")
+        return
+
+    threading.Thread(target=report_metrics, name="speech-metrics", daemon=True).start()
+    try:
+        while stt.is_recording:
+            time.sleep(0.1)
+    finally:
+        stt.stop_recording()
+        stt.cleanup()
+
+
+class SpeechProcess:
+    """Starts speech_worker in a spawned process and hands its events to the caller."""
+
+    def __init__(self, model_size="tiny", options=None, cpus=None):
+        self.context = multiprocessing.get_context("spawn")
+        self.events = self.context.Queue()
+        self.process = self.context.Process(target=speech_worker, name="speech", daemon=True,
+                                            args=(self.events, model_size, options or {}, cpus))
+
+    def start(self):
+        self.process.start()
+        print(f"Started speech process (pid {self.process.pid})")
+        return self
+
+    def poll(self, limit=100):
+        """Events received since the last poll, without blocking."""
+        received = []
+        while len(received) < limit:
+            try:
+                received.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return received
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2)
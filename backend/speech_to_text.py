@@ -1,143 +1,481 @@
 import whisper
 import numpy as np
+import torch
 import pyaudio
 import threading
 import time
+import queue
 import ssl
 import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Callable
 
+from audio_ring import AudioRing
+from metrics import metrics
+from vad import VadSegmenter
+from voice_commands import match_command, match_decoded, COMMAND_PROMPT, COMMAND_MAX_SECONDS, COMMAND_TOKENS
+
 # Fix SSL certificate issues
 ssl._create_default_https_context = ssl._create_unverified_context
 
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 2048  # samples per stream callback
+RING_SECONDS = 30  # audio kept while the transcription worker is busy
+PARTIAL_STEP_SECONDS = 0.5  # new audio between partial decodes in streaming mode
+CONTEXT_CHARS = 200  # previous text carried over as the decoding prompt
+BATCH_THRESHOLD = 2  # queued utterances above which they are decoded as a batch
+MAX_BATCH = 8
+
+# Fixed decoding options per latency profile. Whisper's defaults retry with
+# rising temperatures when a decode looks bad, which makes latency unpredictable.
+LATENCY_PROFILES = {
+    # Single greedy pass, no fallback, no timestamp tokens
+    "fast": {
+        "temperature": 0.0,
+        "without_timestamps": True,
+        "condition_on_previous_text": False,
+    },
+    # Greedy, with at most one sampled retry
+    "balanced": {
+        "temperature": (0.0, 0.4),
+        "best_of": 2,
+        "without_timestamps": True,
+    },
+    # Beam search with Whisper's full temperature fallback
+    "accurate": {
+        "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "beam_size": 5,
+        "best_of": 5,
+    },
+}
+
+
+def load_whisper_model(model_size: str, quantized: bool = False, device: Optional[str] = None):
+    """
+    Load a Whisper model. `quantized` loads it on the CPU with its linear
+    layers dynamically quantized to int8.
+    """
+    if not quantized:
+        return whisper.load_model(model_size, device=device)
+    
+    model = whisper.load_model(model_size, device="cpu")
+    # Whisper's Linear subclass only adds dtype casting, but quantize_dynamic only swaps plain nn.Linear
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def decoding_options(profile: str, model) -> dict:
+    """transcribe() keyword arguments for a latency profile on this model's device."""
+    options = dict(LATENCY_PROFILES[profile])
+    options["fp16"] = model.device.type != "cpu"
+    return options
+
+
+class ModelRegistry:
+    """
+    Process-wide Whisper models, loaded once per (size, device, quantized) on a
+    background thread and shared by every SimpleSpeechToText instance.
+
+    Whisper installs KV-cache hooks on the model for each decode, so decodes on
+    a shared model must not overlap; `lock(model)` is held around them.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._locks = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper-load")
+    
+    def get(self, model_size: str, device: Optional[str] = None, quantized: bool = False) -> Future:
+        """Future resolving to the shared model; the first request starts loading it."""
+        if quantized:
+            device = "cpu"
+        elif device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        key = (model_size, device, quantized)
+        
+        with self._lock:
+            future = self._models.get(key)
+            # A failed load is retried by the next request
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(self._load, model_size, device, quantized)
+                self._models[key] = future
+        return future
+    
+    def lock(self, model) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(id(model), threading.Lock())
+    
+    def _load(self, model_size, device, quantized):
+        print(f"Loading Whisper model: {model_size} ({device}{', int8' if quantized else ''})")
+        started = time.perf_counter()
+        try:
+            model = load_whisper_model(model_size, quantized, device)
+        except Exception as e:
+            # Surfaces through the future; the next get() for this model tries again
+            print(f"Error loading model: {e}")
+            raise
+        metrics.gauge(f"whisper_load_s.{model_size}", time.perf_counter() - started)
+        print("Model loaded successfully!")
+        return model
+
+
+models = ModelRegistry()
+
+
 class SimpleSpeechToText:
     """
     Simplified real-time speech-to-text using local Whisper model.
     """
     
-    def __init__(self, model_size: str = "tiny", callback: Optional[Callable] = None):
+    def __init__(self, model_size: str = "tiny", callback: Optional[Callable] = None,
+                 vad_options: Optional[dict] = None, command_queue=None,
+                 streaming: bool = False, partial_callback: Optional[Callable] = None,
+                 profile: str = "balanced", quantized: bool = False, threads: Optional[int] = None,
+                 device: Optional[str] = None, audio=None):
         """
         Initialize the speech-to-text system.
         
         Args:
             model_size: Whisper model size ('tiny', 'base', 'small')
             callback: Function to call with transcription results
+            vad_options: Keyword arguments for the VadSegmenter that cuts audio into utterances
+            command_queue: Enables command mode; recognized scoring commands are put on this
+                queue.Queue instead of going through full transcription
+            streaming: Decode the utterance in progress every PARTIAL_STEP_SECONDS and prompt
+                each decode with the previous text
+            partial_callback: Function to call with partial results in streaming mode;
+                `callback` only receives finalized text
+            profile: Latency profile fixing the decoding options ('fast', 'balanced', 'accurate')
+            quantized: Run an int8 dynamically quantized copy of the model on the CPU
+            threads: Torch intra-op thread count (process-wide); None keeps torch's default
+            device: Torch device for the model; defaults to CUDA when available
+            audio: PyAudio-compatible interface to open the input stream on, e.g. an
+                audio_source.ReplayAudio; defaults to pyaudio.PyAudio()
+        
+        Returns immediately: the model is loaded (once per process) in the
+        background and `ready` is a future that resolves to it.
         """
+        if profile not in LATENCY_PROFILES:
+            raise ValueError(f"Unknown latency profile: {profile}")
+        if threads:
+            torch.set_num_threads(threads)
+        
         self.model_size = model_size
+        self.profile = profile
+        self.quantized = quantized
         self.callback = callback
+        self.vad_options = vad_options or {}
+        self.command_queue = command_queue
+        self.streaming = streaming
+        self.partial_callback = partial_callback
+        self.context = ""
+        # Partial-result state; only the transcription worker thread touches it
+        self._hypothesis = []
+        self._stable_words = 0
         self.model = None
+        self.model_lock = threading.Lock()
         self.is_recording = False
-        self.audio = pyaudio.PyAudio()
+        self.audio = audio or pyaudio.PyAudio()
         self.stream = None
+        self.ring = AudioRing(SAMPLE_RATE * RING_SECONDS, SAMPLE_RATE)
+        self.worker = None
+        self.decoder = None
+        self.utterances = queue.Queue()
         
-        print(f"Loading Whisper model: {model_size}")
-        try:
-            self.model = whisper.load_model(model_size)
-            print("Model loaded successfully!")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            print("Trying to download model manually...")
-            self._download_model_manually()
+        # Resolves to the shared model; loading happens in the background
+        self.ready = models.get(model_size, device, quantized)
+        self.ready.add_done_callback(self._on_model_ready)
     
-    def _download_model_manually(self):
-        """Manually download the Whisper model if automatic download fails."""
+    def _on_model_ready(self, future):
+        """Take a reference to the shared model once the registry has loaded it."""
         try:
-            # Set up SSL context to ignore certificate verification
-            import os
-            os.environ['CURL_CA_BUNDLE'] = ''
-            
-            # Try loading again with SSL verification disabled
-            self.model = whisper.load_model(self.model_size)
-            print("Model loaded successfully with SSL fix!")
+            model = future.result()
         except Exception as e:
             print(f"Failed to load model: {e}")
-            raise
+            return
+        self.model_lock = models.lock(model)
+        self.model = model
     
-    def start_recording(self):
-        """Start recording and transcribing audio."""
+    def start(self):
+        """
+        Open the microphone and start the transcription worker without blocking.
+
+        Audio is captured by the PyAudio stream callback into a ring buffer, so
+        the microphone keeps being read while a segment is being transcribed.
+        """
         if self.is_recording:
             print("Already recording!")
-            return
+            return False
         
+        if not self.ready.done():
+            print("Waiting for Whisper model...")
+        # Waits for the load; the done-callback may not have run yet when the future resolves
+        self._on_model_ready(self.ready)
         if not self.model:
             print("Model not loaded!")
-            return
+            return False
         
+        self.ring.clear()
+        # Replayed audio can arrive faster than real time
+        self.ring.sample_rate = SAMPLE_RATE * getattr(self.audio, "speed", 1.0)
         self.is_recording = True
         
-        # Audio settings - increased buffer size to prevent overflow
-        sample_rate = 16000
-        chunk_size = 2048  # Increased from 1024
-        duration = 2  # Reduced from 3 seconds to process faster
-        
-        # Open audio stream with larger buffer
         try:
             self.stream = self.audio.open(
                 format=pyaudio.paFloat32,
                 channels=1,
-                rate=sample_rate,
+                rate=SAMPLE_RATE,
                 input=True,
-                frames_per_buffer=chunk_size,
+                frames_per_buffer=CHUNK_SIZE,
                 input_device_index=None,  # Use default device
-                stream_callback=None
+                stream_callback=self._on_audio
             )
         except Exception as e:
             print(f"Error opening audio stream: {e}")
             self.is_recording = False
-            return
+            return False
         
+        self.utterances = queue.Queue()
+        self.worker = threading.Thread(target=self._transcription_worker, name="transcription", daemon=True)
+        self.worker.start()
+        self.decoder = threading.Thread(target=self._decoder_worker, name="whisper-decoder", daemon=True)
+        self.decoder.start()
         print("🎤 Recording started! Speak now...")
+        return True
+    
+    def start_recording(self):
+        """Start recording and transcribing audio; blocks until stop_recording is called."""
+        if not self.start():
+            return
         
         try:
             while self.is_recording:
-                # Record audio chunk with error handling
-                frames = []
-                try:
-                    for _ in range(0, int(sample_rate / chunk_size * duration)):
-                        if not self.is_recording:
-                            break
-                        try:
-                            data = self.stream.read(chunk_size, exception_on_overflow=False)
-                            frames.append(data)
-                        except OSError as e:
-                            if "Input overflowed" in str(e):
-                                # Skip this chunk if buffer overflow
-                                continue
-                            else:
-                                raise
-                except Exception as e:
-                    print(f"Error reading audio: {e}")
-                    break
-                
-                if not self.is_recording or not frames:
-                    break
-                
-                # Combine frames and convert to numpy
-                audio_data = b''.join(frames)
-                audio_array = np.frombuffer(audio_data, dtype=np.float32).copy()  # Make writable
-                
-                # Check if audio has sound (increased threshold slightly)
-                if np.max(np.abs(audio_array)) > 0.005:  # Reduced threshold
-                    try:
-                        # Transcribe
-                        result = self.model.transcribe(audio_array, language="en")
-                        text = result["text"].strip()
-                        
-                        if text and len(text) > 1:  # Only process meaningful text
-                            print(f"🎤 {text}")
-                            if self.callback:
-                                self.callback(text)
-                    except Exception as e:
-                        print(f"Transcription error: {e}")
-                        continue
-                
+                time.sleep(0.1)
         except KeyboardInterrupt:
             print("\n🛑 Stopping...")
-        except Exception as e:
-            print(f"Recording error: {e}")
         finally:
             self.stop_recording()
     
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PyAudio stream callback: copies the block into the ring and returns immediately."""
+        if status & pyaudio.paInputOverflow:
+            metrics.incr("audio_input_overflows")
+        self.ring.write(np.frombuffer(in_data, dtype=np.float32))
+        return (None, pyaudio.paContinue)
+    
+    def _transcription_worker(self):
+        """Cut audio from the ring into utterances and queue each one for decoding as it ends."""
+        segmenter = VadSegmenter(sample_rate=SAMPLE_RATE, **self.vad_options)
+        last_partial = 0
+        while self.is_recording:
+            samples = self.ring.read(CHUNK_SIZE, timeout=0.1)
+            if samples is None:
+                continue
+            metrics.gauge("audio_backlog_s", self.ring.available() / SAMPLE_RATE)
+            closed = segmenter.feed(samples)
+            for utterance in closed:
+                self.utterances.put(utterance)
+            if closed:
+                # The next partial belongs to a new utterance
+                self._hypothesis = []
+                self._stable_words = 0
+            
+            # Partials are skipped while finished utterances are waiting to be decoded
+            if (self.streaming and self.utterances.empty()
+                    and segmenter.position - last_partial >= PARTIAL_STEP_SECONDS * SAMPLE_RATE):
+                last_partial = segmenter.position
+                audio_array = segmenter.open_audio()
+                if audio_array is not None:
+                    self._update_partial(audio_array)
+        
+        # Don't lose the words spoken just before stopping
+        for utterance in segmenter.flush():
+            self.utterances.put(utterance)
+        self.utterances.put(None)
+    
+    def _decoder_worker(self):
+        """
+        Decode queued utterances in order. Normally one at a time; when more
+        than BATCH_THRESHOLD are waiting, up to MAX_BATCH of them go through a
+        single batched forward pass so the backlog stays bounded.
+        """
+        stopping = False
+        while not stopping:
+            utterance = self.utterances.get()
+            if utterance is None:
+                break
+            
+            depth = self.utterances.qsize() + 1
+            metrics.gauge("utterance_queue_depth", depth)
+            metrics.observe("utterance_queue_depth", depth)
+            
+            batch = [utterance]
+            if depth > BATCH_THRESHOLD:
+                while len(batch) < MAX_BATCH:
+                    try:
+                        queued = self.utterances.get_nowait()
+                    except queue.Empty:
+                        break
+                    if queued is None:
+                        stopping = True
+                        break
+                    batch.append(queued)
+            
+            metrics.observe("transcribe_batch_size", len(batch))
+            if len(batch) == 1:
+                self._handle_utterance(utterance)
+            else:
+                self._transcribe_batch(batch)
+    
+    def _is_command_length(self, audio_array):
+        return self.command_queue is not None and len(audio_array) <= COMMAND_MAX_SECONDS * SAMPLE_RATE
+    
+    def _handle_utterance(self, utterance):
+        """Dispatch short utterances that match the command grammar, transcribe the rest."""
+        audio_array = utterance["audio"]
+        if self._is_command_length(audio_array):
+            command = self._spot_command(audio_array)
+            if command:
+                self._queue_command(command, utterance)
+                return
+        self._transcribe(audio_array, utterance["end"])
+    
+    def _queue_command(self, command, utterance):
+        command["spoken_at"] = self.ring.time_of(utterance["end"])
+        metrics.observe("command_recognition_s", time.time() - command["spoken_at"])
+        print(f"🗣️ Command: {command['text']}")
+        self.command_queue.put(command)
+    
+    def _transcribe_batch(self, utterances):
+        """
+        Decode several utterances in one padded forward pass and dispatch them
+        in order. Batches use a single greedy (or beam) pass without the
+        profile's temperature fallback.
+        """
+        try:
+            started = time.perf_counter()
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(utterance["audio"]), self.model.dims.n_mels)
+                for utterance in utterances
+            ])
+            options = whisper.DecodingOptions(
+                language="en",
+                temperature=0.0,
+                beam_size=LATENCY_PROFILES[self.profile].get("beam_size"),
+                prompt=(self.context or None) if self.streaming else None,
+                without_timestamps=True,
+                fp16=self.model.device.type != "cpu",
+            )
+            with self.model_lock:
+                results = whisper.decode(self.model, mels.to(self.model.device), options)
+            metrics.observe("transcribe_batch_s", time.perf_counter() - started)
+        except Exception as e:
+            print(f"Batched transcription error: {e}")
+            for utterance in utterances:
+                self._handle_utterance(utterance)
+            return
+        
+        for utterance, result in zip(utterances, results):
+            # Same silence rule transcribe() applies
+            if result.no_speech_prob > 0.6 and result.avg_logprob < -1:
+                continue
+            text = result.text.strip()
+            if self._is_command_length(utterance["audio"]):
+                command = match_decoded(result)
+                if command:
+                    self._queue_command(command, utterance)
+                    continue
+            self._deliver(text, utterance["end"])
+    
+    def _spot_command(self, audio_array):
+        """
+        Decode only a few tokens, prompted with the command grammar, and match
+        them against it. Much cheaper than a full transcribe() call; anything
+        that doesn't match, or that Whisper isn't confident is speech, falls
+        back to full transcription.
+        """
+        try:
+            started = time.perf_counter()
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio_array), self.model.dims.n_mels)
+            options = whisper.DecodingOptions(
+                language="en",
+                prompt=COMMAND_PROMPT,
+                sample_len=COMMAND_TOKENS,
+                without_timestamps=True,
+                fp16=self.model.device.type != "cpu",
+            )
+            with self.model_lock:
+                result = whisper.decode(self.model, mel.to(self.model.device), options)
+            metrics.observe("command_decode_s", time.perf_counter() - started)
+            command = match_decoded(result)
+            if command is None and match_command(result.text):
+                metrics.incr("commands_rejected_low_confidence")
+            return command
+        except Exception as e:
+            print(f"Command decoding error: {e}")
+            return None
+    
+    def _decode(self, audio_array):
+        """Run Whisper on one window of audio and return its text."""
+        options = decoding_options(self.profile, self.model)
+        if self.streaming:
+            # Carry the previous text over so words at window boundaries keep their context
+            options["initial_prompt"] = self.context or None
+            options["condition_on_previous_text"] = False
+        with self.model_lock:
+            result = self.model.transcribe(audio_array, language="en", **options)
+        return result["text"].strip()
+    
+    def _update_partial(self, audio_array):
+        """
+        Decode the utterance so far and emit the words that agree with the
+        previous partial decode, so captions don't flicker as the tail changes.
+        """
+        try:
+            started = time.perf_counter()
+            words = self._decode(audio_array).split()
+            metrics.observe("partial_transcribe_s", time.perf_counter() - started)
+        except Exception as e:
+            print(f"Partial transcription error: {e}")
+            return
+        
+        stable = []
+        for previous, word in zip(self._hypothesis, words):
+            if previous != word:
+                break
+            stable.append(word)
+        self._hypothesis = words
+        
+        if len(stable) > self._stable_words:
+            self._stable_words = len(stable)
+            if self.partial_callback:
+                self.partial_callback(" ".join(stable))
+    
+    def _transcribe(self, audio_array, speech_end=None):
+        """Transcribe one utterance and pass meaningful text to the callback."""
+        try:
+            started = time.perf_counter()
+            text = self._decode(audio_array)
+            metrics.observe("transcribe_s", time.perf_counter() - started)
+            self._deliver(text, speech_end)
+        except Exception as e:
+            print(f"Transcription error: {e}")
+    
+    def _deliver(self, text, speech_end=None):
+        """Carry finalized text over as context and pass meaningful text to the callback."""
+        if self.streaming and text:
+            self.context = (self.context + " " + text).strip()[-CONTEXT_CHARS:]
+        
+        if text and len(text) > 1:  # Only process meaningful text
+            print(f"🎤 {text}")
+            if speech_end is not None:
+                metrics.observe("speech_end_to_callback_s", time.time() - self.ring.time_of(speech_end))
+            if self.callback:
+                self.callback(text)
+    
     def stop_recording(self):
         """Stop recording."""
         self.is_recording = False
@@ -149,6 +487,13 @@ class SimpleSpeechToText:
                 print(f"Error closing stream: {e}")
             finally:
                 self.stream = None
+        if self.worker and self.worker is not threading.current_thread():
+            self.worker.join(timeout=5)
+            self.worker = None
+        # The decoder finishes the utterances still queued, then exits
+        if self.decoder and self.decoder is not threading.current_thread():
+            self.decoder.join(timeout=10)
+            self.decoder = None
         print("Recording stopped")
     
     def cleanup(self):
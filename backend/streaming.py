@@ -1,5 +1,6 @@
 from record3d import Record3DStream
 import cv2
+import time
 from threading import Event
 import numpy as np
 
@@ -12,8 +13,10 @@ class StreamingManager:
         self.DEVICE_TYPE__LIDAR = 1
         self.intrinsics = None
         self.pose = None
+        self.frame_time = None
 
     def on_new_frame(self):
+        self.frame_time = time.time()  # host clock when the device delivered the frame
         self.event.set()  # notify to stop waiting
 
     def on_stream_stopped(self):
@@ -41,8 +44,13 @@ class StreamingManager:
                          [0, 0, 1]])
 
     def get_frames(self):
+        for rgb, depth, _ in self.get_timed_frames():
+            yield rgb, depth  # tuple
+
+    def get_timed_frames(self):
         while True:
             self.event.wait()
+            frame_time = self.frame_time
 
             depth = self.session.get_depth_frame()
             rgb = self.session.get_rgb_frame()
@@ -56,7 +64,7 @@ class StreamingManager:
 
             self.event.clear()
 
-            yield rgb, depth  # tuple
+            yield rgb, depth, frame_time
 
 
 if __name__ == '__main__':
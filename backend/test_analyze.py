@@ -0,0 +1,28 @@
+from analyze import stitch_tracks
+
+
+def rows(*frames):
+    """Rows along a straight, slow trajectory: (frame, tracker_id) pairs."""
+    return [{"frame": frame, "time": frame / 30, "x": 100.0 + 2 * frame, "y": 200.0, "z": 1.0, "tracker_id": local}
+            for frame, local in frames]
+
+
+def test_untracked_rows_at_chunk_start_continue_the_previous_track():
+    chunks = [rows((1, -1), (2, 3), (3, 3)), rows((4, None), (5, 1), (6, 1))]
+    assert [row["track"] for row in stitch_tracks(chunks, max_gap=15)] == [1, 1, 1, 1, 1, 1]
+
+
+def test_untracked_rows_before_first_id_join_it():
+    chunks = [rows((1, None), (2, -1), (3, 7), (4, 7))]
+    assert [row["track"] for row in stitch_tracks(chunks, max_gap=15)] == [1, 1, 1, 1]
+
+
+def test_distant_track_after_gap_is_new():
+    first = rows((1, 3), (2, 3))
+    later = rows((40, None), (41, 1))
+    assert [row["track"] for row in stitch_tracks([first, later], max_gap=15)] == [1, 1, 2, 2]
+
+
+def test_untracked_chunk_gets_its_own_track():
+    chunks = [rows((1, 3), (2, 3)), rows((50, None), (51, -1))]
+    assert [row["track"] for row in stitch_tracks(chunks, max_gap=15)] == [1, 1, 2, 2]
@@ -0,0 +1,65 @@
+import numpy as np
+
+from detectors import CachedDetector
+
+
+class CountingDetector:
+    """Returns the centre of the brightest pixel, so stale results are easy to spot."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, frame, confidence=0.3):
+        self.calls += 1
+        y, x = np.unravel_index(frame.max(axis=2).argmax(), frame.shape[:2])
+        return [(int(x), int(y))] if frame.any() else []
+
+    def detect_batch(self, frames, confidence=0.3):
+        return [self.detect(frame, confidence) for frame in frames]
+
+
+def shuttle_frame(x, y, size):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[y:y + size, x:x + size] = 255
+    return frame
+
+
+def test_small_shuttle_on_dark_frame_is_not_idle():
+    detector = CountingDetector()
+    cache = CachedDetector(detector)
+
+    assert cache.detect(np.zeros((480, 640, 3), dtype=np.uint8)) == []
+    assert cache.detect(shuttle_frame(300, 200, 6)) == [(300, 200)]
+    assert detector.calls == 2
+
+
+def test_moving_shuttle_never_gets_stale_boxes():
+    detector = CountingDetector()
+    cache = CachedDetector(detector)
+
+    for step in range(10):
+        x = 100 + 5 * step
+        assert cache.detect(shuttle_frame(x, 200, 12)) == [(x, 200)]
+    assert detector.calls == 10
+    assert cache.hits == 0
+
+
+def test_identical_frames_hit():
+    detector = CountingDetector()
+    cache = CachedDetector(detector)
+    idle = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    for _ in range(5):
+        assert cache.detect(idle.copy()) == []
+    assert detector.calls == 1
+    assert cache.hits == 4
+
+
+def test_batch_only_sends_misses():
+    detector = CountingDetector()
+    cache = CachedDetector(detector)
+    cache.detect(shuttle_frame(100, 100, 6))
+
+    results = cache.detect_batch([shuttle_frame(100, 100, 6), shuttle_frame(105, 100, 6)])
+    assert results == [[(100, 100)], [(105, 100)]]
+    assert detector.calls == 2
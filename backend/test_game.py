@@ -0,0 +1,76 @@
+import json
+
+from game import Game, SNAPSHOT_INTERVAL
+
+
+def test_undo_redo_round_trip():
+    game = Game()
+    game.add_point(0)
+    game.add_point(1)
+    game.add_point(1)
+
+    assert game.undo() and game.get_points() == [1, 1]
+    assert game.undo() and game.get_points() == [1, 0]
+    assert game.redo() and game.get_points() == [1, 1]
+
+    game.add_point(0)  # a new action drops the redo history
+    assert not game.redo()
+    assert game.get_points() == [2, 1]
+
+
+def test_scoring_rules_unchanged():
+    game = Game()
+    assert game.sets_to_win() == 1
+    for _ in range(25):
+        game.add_point(0)
+    assert game.get_points() == [25, 0]  # points alone never end a set
+
+    game.update_sets()  # a set win takes the match (best of 3 -> 1 set) and starts a new one
+    assert game.get_points() == [0, 0] and game.get_sets() == [0, 0] and game.set == 1
+    assert game.undo() and game.get_points() == [25, 0]
+
+
+def test_state_at_and_replay():
+    game = Game()
+    for index in range(SNAPSHOT_INTERVAL + 10):
+        game.add_point(index % 2)
+    assert game.state_at(3)["team1_points"] == 2
+    assert game.state_at(len(game.log)) == game.to_dict()
+
+    replica = Game.replay(game.events())
+    assert replica.to_dict() == game.to_dict()
+    before_last = game.state_at(len(game.log) - 1)
+    assert replica.undo()
+    assert replica.get_points() == [before_last["team1_points"], before_last["team2_points"]]
+
+
+def test_recovery_keeps_undo_history(tmp_path):
+    path = str(tmp_path / "match.jsonl")
+    game = Game(log_path=path)
+    game.add_point(0)
+    game.add_point(0)
+    game.add_point(1)
+    game.undo()
+
+    recovered = Game(log_path=path)
+    assert recovered.get_points() == [2, 0]
+    assert recovered.redo() and recovered.get_points() == [2, 1]
+    assert recovered.undo() and recovered.undo() and recovered.get_points() == [1, 0]
+
+
+def test_torn_line_is_truncated_before_appending(tmp_path):
+    path = str(tmp_path / "match.jsonl")
+    game = Game(log_path=path)
+    for team in (0, 0, 0, 1):
+        game.add_point(team)
+    with open(path, "a") as f:
+        f.write('{"seq": 4, "type": "poi')  # crash mid-write
+
+    restarted = Game(log_path=path)
+    assert restarted.get_points() == [3, 1]
+    restarted.add_point(1)
+
+    restarted_again = Game(log_path=path)
+    assert restarted_again.get_points() == [3, 2]
+    with open(path) as f:
+        assert [json.loads(line)["seq"] for line in f] == [0, 1, 2, 3, 4]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from vad import VadSegmenter
+
+SAMPLE_RATE = 16000
+
+
+def noise(seconds, rms, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE)) * rms).astype(np.float32)
+
+
+def tone(seconds, amplitude):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def feed(segmenter, audio, block=1024):
+    utterances = []
+    for start in range(0, len(audio), block):
+        utterances.extend(segmenter.feed(audio[start:start + block]))
+    return utterances + segmenter.flush()
+
+
+def test_stationary_noise_above_threshold_is_not_speech():
+    segmenter = VadSegmenter()
+    assert feed(segmenter, noise(30, 0.02)) == []
+    assert segmenter.noise_floor > segmenter.threshold
+
+
+def test_speech_over_noise_is_segmented():
+    background = noise(8, 0.02)
+    background[3 * SAMPLE_RATE:4 * SAMPLE_RATE] += tone(1, 0.3)
+    utterances = feed(VadSegmenter(), background)
+    assert len(utterances) == 1
+    assert abs(utterances[0]["end"] / SAMPLE_RATE - 4) < 0.1
+
+
+def test_quiet_room_speech_is_segmented():
+    audio = np.concatenate([noise(1, 0.001), tone(1, 0.1), noise(1, 0.001), tone(0.5, 0.1), noise(1, 0.001)])
+    assert len(feed(VadSegmenter(), audio)) == 2
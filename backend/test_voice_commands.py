@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from game import Game
+from voice_commands import match_command, match_decoded, apply_command
+
+
+def decoded(text, no_speech_prob=0.05, avg_logprob=-0.2):
+    """Stand-in for a whisper.DecodingResult."""
+    return SimpleNamespace(text=text, no_speech_prob=no_speech_prob, avg_logprob=avg_logprob)
+
+
+def test_match_command_grammar():
+    assert match_command("Point left.")["team"] == 0
+    assert match_command("point rite")["team"] == 1
+    assert match_command("Undo!")["action"] == "undo"
+    assert match_command("what a rally") is None
+
+
+def test_confident_decode_is_a_command():
+    assert match_decoded(decoded(" point left."))["team"] == 0
+
+
+def test_no_speech_decode_is_not_a_command():
+    # A noise burst the prompt talked the decoder into reading as the grammar
+    assert match_decoded(decoded(" point left.", no_speech_prob=0.8, avg_logprob=-0.3)) is None
+    assert match_decoded(decoded(" point right.", no_speech_prob=0.1, avg_logprob=-1.4)) is None
+
+
+def test_rejected_decode_leaves_score_alone():
+    game = Game()
+    command = match_decoded(decoded(" point left.", no_speech_prob=0.9, avg_logprob=-1.2))
+    if command:
+        apply_command(game, command)
+    assert game.get_points() == [0, 0]
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class FrameTracer:
+    """
+    Records begin/end spans of each frame as it moves through the pipeline and
+    dumps them as Chrome trace JSON (open with https://ui.perfetto.dev).
+
+    Spans live in a preallocated ring buffer so tracing a long session never
+    grows memory; only the most recent `capacity` spans are kept.
+    """
+
+    def __init__(self, capacity=32768, budget_ms=None, dump_dir="traces",
+                 min_dump_interval=5.0, enabled=True):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.budget = budget_ms / 1000 if budget_ms else None
+        self.dump_dir = dump_dir
+        self.min_dump_interval = min_dump_interval
+
+        self._names = [None] * capacity
+        self._frames = [0] * capacity
+        self._threads = [0] * capacity
+        self._starts = [0.0] * capacity
+        self._ends = [0.0] * capacity
+        self._next = 0
+        self._count = 0
+
+        self._lock = threading.Lock()
+        self._thread_names = {}
+        self._frame_starts = {}
+        self._last_dump = 0.0
+        self.last_frame_id = None
+
+    def _record(self, name, frame_id, start, end):
+        tid = threading.get_ident()
+        with self._lock:
+            i = self._next
+            self._names[i] = name
+            self._frames[i] = frame_id
+            self._threads[i] = tid
+            self._starts[i] = start
+            self._ends[i] = end
+            self._next = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            if tid not in self._thread_names:
+                self._thread_names[tid] = threading.current_thread().name
+
+    @contextmanager
+    def _span(self, name, frame_id):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, frame_id, start, time.perf_counter())
+
+    def span(self, name, frame_id=None):
+        if not self.enabled:
+            return nullcontext()
+        if frame_id is None:
+            frame_id = self.last_frame_id
+        return self._span(name, frame_id)
+
+    def begin(self, name, frame_id=None):
+        """Opens a span that can't be expressed as a `with` block; close it with `end`."""
+        if not self.enabled:
+            return None
+        return name, frame_id, time.perf_counter()
+
+    def end(self, token):
+        if token is not None:
+            name, frame_id, start = token
+            self._record(name, frame_id, start, time.perf_counter())
+
+    def begin_frame(self, frame_id):
+        if self.enabled:
+            self._frame_starts[frame_id] = time.perf_counter()
+
+    def end_frame(self, frame_id):
+        """Closes the whole-frame span and dumps the buffer if the frame blew its budget."""
+        if not self.enabled:
+            return
+        start = self._frame_starts.pop(frame_id, None)
+        if start is None:
+            return
+        end = time.perf_counter()
+        self._record("frame", frame_id, start, end)
+        self.last_frame_id = frame_id
+
+        if self.budget is not None and end - start > self.budget:
+            if end - self._last_dump >= self.min_dump_interval:
+                self._last_dump = end
+                threading.Thread(
+                    target=self.dump,
+                    kwargs={"reason": f"frame{frame_id}_{(end - start) * 1000:.0f}ms"},
+                    daemon=True,
+                ).start()
+
+    def events(self):
+        """Returns the buffered spans as a list of Chrome trace events, oldest first."""
+        with self._lock:
+            first = (self._next - self._count) % self.capacity
+            order = [(first + k) % self.capacity for k in range(self._count)]
+            spans = [(self._names[i], self._frames[i], self._threads[i],
+                      self._starts[i], self._ends[i]) for i in order]
+            thread_names = dict(self._thread_names)
+
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        for name, frame_id, tid, start, end in spans:
+            events.append({
+                "name": name,
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": {"frame": frame_id},
+            })
+        return events
+
+    def dump(self, path=None, reason="manual"):
+        if path is None:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            path = os.path.join(self.dump_dir, f"trace_{int(time.time())}_{reason}.json")
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+        print(f"Trace written to {path}")
+        return path
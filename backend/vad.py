@@ -0,0 +1,127 @@
+from collections import deque
+
+import numpy as np
+
+from metrics import metrics
+
+
+class VadSegmenter:
+    """
+    Streaming energy-based voice activity detector that cuts audio into
+    utterances.
+
+    Audio is split into `frame_ms` frames and each frame's RMS energy is
+    computed in one vectorized pass per block. A frame is speech when its
+    energy exceeds both `threshold` and `noise_ratio` times the noise floor.
+    The floor is the minimum frame energy over the last `noise_window_ms`
+    (minimum statistics): pauses between words keep it at the background level
+    while someone talks, and steady crowd or hall noise raises it within one
+    window. An utterance opens after `start_frames` consecutive speech frames,
+    with `pre_roll_ms` of audio before it kept so soft onsets aren't clipped,
+    and closes after `hangover_ms` of silence or at `max_segment_s`. Trailing
+    silence is trimmed to `tail_ms` and utterances with less than
+    `min_speech_ms` of speech are dropped as clicks or bumps.
+
+    `feed` returns finished utterances as dicts with the `audio` and the
+    absolute sample positions of its `start` and of the `end` of speech.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=30, threshold=0.005, noise_ratio=3.0, start_frames=3,
+                 hangover_ms=400, pre_roll_ms=200, tail_ms=90, max_segment_s=10.0, min_speech_ms=150,
+                 noise_window_ms=1500):
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.threshold = threshold
+        self.noise_ratio = noise_ratio
+        self.noise_floor = threshold / noise_ratio
+        self.recent_energy = deque(maxlen=max(noise_window_ms // frame_ms, 1))
+        self.start_frames = start_frames
+        self.hangover_frames = max(hangover_ms // frame_ms, 1)
+        self.tail_frames = tail_ms // frame_ms
+        self.max_frames = int(max_segment_s * 1000 // frame_ms)
+        self.min_speech_frames = max(min_speech_ms // frame_ms, 1)
+
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.position = 0  # absolute sample index of pending[0]
+        self.pre_roll = deque(maxlen=pre_roll_ms // frame_ms + start_frames)
+        self.reset()
+
+    def reset(self):
+        self.in_speech = False
+        self.speech_run = 0
+        self.frames = []
+        self.start = 0
+        self.last_speech = 0
+        self.speech_frames = 0
+
+    def frame_energy(self, frames):
+        """RMS energy of each row of a (frames, frame_size) array."""
+        return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frames.shape[1])
+
+    def feed(self, samples):
+        data = np.concatenate((self.pending, samples)) if len(self.pending) else samples
+        count = len(data) // self.frame_size
+        frames = data[:count * self.frame_size].reshape(count, self.frame_size)
+        self.pending = data[count * self.frame_size:].copy()
+        if count == 0:
+            return []
+
+        energy = self.frame_energy(frames)
+        self.recent_energy.extend(energy.tolist())
+        self.noise_floor = min(self.recent_energy)
+        is_speech = energy > max(self.threshold, self.noise_floor * self.noise_ratio)
+
+        utterances = []
+        for index in range(count):
+            frame, speech = frames[index], is_speech[index]
+            end = self.position + (index + 1) * self.frame_size
+
+            if not self.in_speech:
+                self.pre_roll.append(frame)
+                self.speech_run = self.speech_run + 1 if speech else 0
+                if self.speech_run >= self.start_frames:
+                    self.in_speech = True
+                    self.frames = list(self.pre_roll)
+                    self.pre_roll.clear()
+                    self.start = end - len(self.frames) * self.frame_size
+                    self.last_speech = len(self.frames)
+                    self.speech_frames = self.speech_run
+                continue
+
+            self.frames.append(frame)
+            if speech:
+                self.last_speech = len(self.frames)
+                self.speech_frames += 1
+
+            if len(self.frames) - self.last_speech >= self.hangover_frames:
+                utterances.extend(self._finish())
+            elif len(self.frames) >= self.max_frames:
+                # Still talking: cut here and continue straight into the next segment
+                utterances.extend(self._finish())
+                self.in_speech = True
+                self.start = end
+
+        self.position += count * self.frame_size
+        return utterances
+
+    def open_audio(self):
+        """Audio of the utterance still in progress, or None."""
+        return np.concatenate(self.frames) if self.in_speech and self.frames else None
+
+    def flush(self):
+        """Closes the open utterance, if any (e.g. when recording stops)."""
+        return self._finish() if self.in_speech else []
+
+    def _finish(self):
+        frames = self.frames[:self.last_speech + self.tail_frames]
+        speech_frames = self.speech_frames
+        start, end = self.start, self.start + self.last_speech * self.frame_size
+        self.reset()
+
+        if speech_frames < self.min_speech_frames or not frames:
+            metrics.incr("vad_segments_dropped")
+            return []
+        audio = np.concatenate(frames)
+        metrics.incr("vad_segments")
+        metrics.observe("vad_segment_s", len(audio) / self.sample_rate)
+        return [{"audio": audio, "start": start, "end": end}]
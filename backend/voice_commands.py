@@ -0,0 +1,50 @@
+import difflib
+import re
+
+# Spoken phrase -> (action, team index); left is team 1, matching check_for_point
+COMMANDS = {
+    "point left": ("point", 0),
+    "point right": ("point", 1),
+    "undo": ("undo", None),
+}
+# Biases the decoder toward the grammar
+COMMAND_PROMPT = "Umpire calls: point left. point right. undo."
+# Utterances longer than this are never commands and go straight to full transcription
+COMMAND_MAX_SECONDS = 2.0
+# Tokens to decode for a command; a phrase plus punctuation fits comfortably
+COMMAND_TOKENS = 8
+# A command changes the score, so decodes that look like noise are rejected outright: either a likely
+# no-speech segment or a low-confidence decode is enough (stricter than the transcript silence rule)
+COMMAND_MAX_NO_SPEECH_PROB = 0.4
+COMMAND_MIN_AVG_LOGPROB = -0.7
+
+
+def match_command(text, cutoff=0.75):
+    """Maps a transcript to a command dict, or None if it isn't close to any phrase in the grammar."""
+    normalized = re.sub(r"[^a-z ]", "", text.lower()).strip()
+    if not normalized:
+        return None
+
+    phrase = normalized if normalized in COMMANDS else None
+    if phrase is None:
+        matches = difflib.get_close_matches(normalized, COMMANDS, n=1, cutoff=cutoff)
+        phrase = matches[0] if matches else None
+    if phrase is None:
+        return None
+
+    action, team = COMMANDS[phrase]
+    return {"action": action, "team": team, "text": text}
+
+
+def match_decoded(result, cutoff=0.75):
+    """match_command for a Whisper DecodingResult, or None if the decode doesn't look like confident speech."""
+    if result.no_speech_prob > COMMAND_MAX_NO_SPEECH_PROB or result.avg_logprob < COMMAND_MIN_AVG_LOGPROB:
+        return None
+    return match_command(result.text, cutoff)
+
+
+def apply_command(game, command):
+    if command["action"] == "point":
+        game.add_point(command["team"])
+    elif command["action"] == "undo":
+        game.undo()
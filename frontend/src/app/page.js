@@ -7,6 +7,7 @@ export default function FileAnalyzer() {
     const [gameData, setGameData] = useState(null);
     const [prevGameData, setPrevGameData] = useState(null);
     const [flipStates, setFlipStates] = useState({ team1: [false, false], team2: [false, false] });
+    const [caption, setCaption] = useState(null);
 
     useEffect(() => {
         document.title = "🏸 Goodminton > Badminton";
@@ -25,6 +26,12 @@ export default function FileAnalyzer() {
 
             socket.onmessage = (event) => {
                 const data = JSON.parse(event.data);
+
+                // Live transcripts arrive on their own topic; everything else is game state
+                if (data.topic === "caption") {
+                    setCaption(data);
+                    return;
+                }
                 
                 // Check if points changed to trigger animations
                 if (gameData) {
@@ -166,6 +173,14 @@ export default function FileAnalyzer() {
                             </div>
                         </div>
 
+                        {/* Live Captions */}
+                        {caption && (
+                            <div className="bg-white dark:bg-slate-800 rounded-2xl shadow-xl p-6 border border-gray-200 dark:border-slate-700 text-center">
+                                <p className="text-sm text-gray-500 dark:text-gray-400">{caption.kind === "command" ? "Umpire Call" : "Live Caption"}</p>
+                                <p className={`text-xl text-gray-900 dark:text-white ${caption.kind === "partial" ? "italic opacity-70" : "font-bold"}`}>{caption.text}</p>
+                            </div>
+                        )}
+
                         {/* Scoreboard */}
                         <div className="bg-white dark:bg-slate-800 rounded-2xl shadow-xl p-8 border border-gray-200 dark:border-slate-700">
                             <h2 className="text-3xl font-bold text-gray-900 dark:text-white mb-6 text-center">Scoreboard</h2>